@@ -1,105 +1,42 @@
 # app.py
-import json
 import time
-import sqlite3
-from pathlib import Path
 from datetime import date, datetime, timedelta
 from zoneinfo import ZoneInfo
 
-import pandas as pd
 import streamlit as st
 
 from libcal_bot.paths import DB_PATH
-from libcal_bot.fetch_availability.db import init_db
 from libcal_bot.fetch_availability.fetch_all_seats import init_static_data
 from libcal_bot.app.libcal_actions import (
     get_available_seats,
+    clear_available_seats_cache,
     update_availability_for_date,
     book_seat_now,
     load_all_seats_from_db,
     run_checkin_now,
     run_hunt_now,
     to_libcal_label,
+    start_label_re,
     next_hunting_tick,
-    worker_is_running
+    seats_count,
+)
+from libcal_bot.worker.tasks import list_checkins, cancel_checkin, start_hunting, stop_hunting, schedule_checkin
+from libcal_bot.app.helpers import (
+    OPTIONS,
+    END_OPTIONS,
+    OPTIONS_IDX,
+    AREA_OPTIONS,
+    POWER_OPTIONS,
+    end_option_index,
+    load_profile_cached,
+    profile_mtime_ns,
+    save_profile,
+    throttled_progress_cb,
+    db_ready_cached,
+    worker_running_cached,
+    hunting_status_cached,
+    seat_options,
 )
-from libcal_bot.worker.tasks import list_checkins, cancel_checkin, start_hunting, get_hunting_status, stop_hunting, schedule_checkin
-
-
-# ----------------------------
-# Profile handling
-# ----------------------------
-
-PROFILE_PATH = Path(__file__).resolve().parent / "user_profile.json"
-
-
-def load_profile() -> dict:
-    if PROFILE_PATH.exists():
-        return json.loads(PROFILE_PATH.read_text(encoding="utf-8"))
-    return {
-        "first_name": "",
-        "last_name": "",
-        "email": "",
-        "phone": "",
-        "student_number": "",
-    }
-
-
-def save_profile(profile: dict) -> None:
-    PROFILE_PATH.write_text(json.dumps(profile, indent=2), encoding="utf-8")
-
-
-# ----------------------------
-# Time helpers
-# ----------------------------
-
-def half_hour_options(start="09:00", end="23:30"):
-    sh, sm = map(int, start.split(":"))
-    eh, em = map(int, end.split(":"))
-
-    opts = []
-    h, m = sh, sm
-    while (h, m) <= (eh, em):
-        opts.append(f"{h:02d}:{m:02d}")
-        m += 30
-        if m >= 60:
-            h += 1
-            m -= 60
-    return opts
-
-
-OPTIONS = half_hour_options("09:00", "23:30") + ["00:00"]
-
-AREA_OPTIONS = [
-    "1.B",
-    "2.A", "2.B", "2.C",
-    "3.A", "3.B", "3.C",
-    "4.A", "4.B", "4.C",
-]
-
-POWER_OPTIONS = ["Power available", "No power"]  # you can select one or both
-
-
-# ----------------------------
-# Database readiness check
-# ----------------------------
-
-def db_ready() -> tuple[bool, str]:
-    # maak DB + schema altijd aan
-    conn = init_db(str(DB_PATH))
-    try:
-        cur = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='seats'")
-        if cur.fetchone() is None:
-            return False, "Database schema ontbreekt (geen seats tabel)."
-
-        n = conn.execute("SELECT COUNT(*) FROM seats").fetchone()[0]
-        if n == 0:
-            return False, "Database bestaat, maar seats zijn nog leeg. Initialiseer dataset."
-        return True, f"Database OK ({n} seats)."
-    except sqlite3.Error as e:
-        return False, f"Database error: {e}"
-    finally:
-        conn.close()
 
 
 # ----------------------------
@@ -109,7 +46,7 @@ def db_ready() -> tuple[bool, str]:
 st.set_page_config(page_title="LibCal Seat Booker", layout="wide")
 st.title("LibCal Seat Booker")
 
-ok, msg = db_ready()
+ok, msg = db_ready_cached()
 
 # ----------------------------
 # First-run initialisation
@@ -127,13 +64,7 @@ if not ok:
         status = st.empty()
         started = time.time()
 
-        def cb(i, total, seat_id, failed):
-            pct = int((i / total) * 100) if total else 0
-            progress.progress(pct)
-            status.write(
-                f"Initialising seats {i}/{total} "
-                f"(failed: {failed}) — last seat: {seat_id}"
-            )
+        cb = throttled_progress_cb(progress, status, "Initialising seats")
 
         with st.spinner("Initialising static seat data…"):
             total, failed = init_static_data(
@@ -148,6 +79,9 @@ if not ok:
             f"Took {elapsed:.1f}s."
         )
 
+        db_ready_cached.clear()
+        load_all_seats_from_db.clear()
+        st.session_state.pop("all_seats", None)
         st.rerun()
 
     st.stop()
@@ -160,19 +94,35 @@ if not ok:
 st.sidebar.header("Booking settings")
 
 if "profile" not in st.session_state:
-    st.session_state.profile = load_profile()
+    st.session_state.profile = load_profile_cached(profile_mtime_ns())
 
 p = st.session_state.profile
 
-p["first_name"] = st.sidebar.text_input("First name", value=p["first_name"])
-p["last_name"] = st.sidebar.text_input("Last name", value=p["last_name"])
-p["email"] = st.sidebar.text_input("Email", value=p["email"])
-p["phone"] = st.sidebar.text_input("Phone", value=p["phone"])
-p["student_number"] = st.sidebar.text_input("Student number", value=p["student_number"])
-
-if st.sidebar.button("Save profile"):
-    save_profile(p)
-    st.sidebar.success("Saved locally.")
+# form: typing in these fields doesn't rerun the whole page, only "Save profile" does
+with st.sidebar.form("profile_form"):
+    first_name = st.text_input("First name", value=p["first_name"])
+    last_name = st.text_input("Last name", value=p["last_name"])
+    email = st.text_input("Email", value=p["email"])
+    phone = st.text_input("Phone", value=p["phone"])
+    student_number = st.text_input("Student number", value=p["student_number"])
+
+    submitted = st.form_submit_button("Save profile")
+
+if submitted:
+    new_profile = dict(
+        first_name=first_name,
+        last_name=last_name,
+        email=email,
+        phone=phone,
+        student_number=student_number,
+    )
+    # only touch disk when something actually changed
+    if any(p.get(k) != v for k, v in new_profile.items()):
+        p.update(new_profile)
+        save_profile(p)
+        st.sidebar.success("Saved locally.")
+    else:
+        st.sidebar.info("No changes to save.")
 
 
 # ----------------------------
@@ -188,18 +138,18 @@ with colB:
     start_time = st.selectbox(
         "Start",
         OPTIONS,
-        index=OPTIONS.index("10:00") if "10:00" in OPTIONS else 0,
+        index=OPTIONS_IDX.get("10:00", 0),
         key="start_time",
     )
 
-start_idx = OPTIONS.index(st.session_state.start_time)
-end_options = OPTIONS[start_idx + 1:]
+end_options = END_OPTIONS[st.session_state.start_time]
 
 # bepaal default index
-if "end_time" in st.session_state and st.session_state.end_time in end_options:
-    end_index = end_options.index(st.session_state.end_time)
-else:
-    end_index = end_options.index("22:00") if "22:00" in end_options else 0
+end_index = None
+if "end_time" in st.session_state:
+    end_index = end_option_index(st.session_state.start_time, st.session_state.end_time)
+if end_index is None:
+    end_index = end_option_index(st.session_state.start_time, "22:00") or 0
 
 with colC:
     end_time = st.selectbox(
@@ -235,8 +185,13 @@ with seats_col:
         st.warning("No seats available in this interval (or no data available).")
     else:
         st.success(f"{len(seats)} seats fully available.")
-        df = pd.DataFrame(seats, columns=["seat_name", "seat_url", "seat_id", "power_available"])
-        st.dataframe(df[["seat_name", "power_available", "seat_url"]], width="stretch")
+        st.dataframe(
+            get_available_seats(x, y, as_frame=True),
+            column_order=("seat_name", "power_available", "seat_url"),
+            column_config={"seat_url": st.column_config.LinkColumn("Link", display_text="open")},
+            width="stretch",
+            hide_index=True,
+        )
 
 # ==========
 # Book
@@ -245,9 +200,11 @@ with book_col:
     st.subheader("Book")
 
     if not seats:
-        all_seats = load_all_seats_from_db()
+        if "all_seats" not in st.session_state:
+            st.session_state.all_seats = load_all_seats_from_db()
+        all_seats = st.session_state.all_seats
 
-        if not all_seats:
+        if not all_seats.names:
             st.info("No seats found in DB yet. Run seat discovery / init first.")
             chosen_name = None
             chosen_id = None
@@ -255,12 +212,16 @@ with book_col:
         else:
             chosen_name = st.selectbox(
                 "Choose a seat to try booking anyway",
-                options=list(all_seats.keys()),
+                options=all_seats.names,
                 index=None,
                 placeholder="Type to search…",
                 key="fallback_seat_name",
             )
-            chosen_id, chosen_url = all_seats[chosen_name] if chosen_name else (None, None)
+            if chosen_name:
+                i = all_seats.names.index(chosen_name)
+                chosen_id, chosen_url = all_seats.ids[i], all_seats.urls[i]
+            else:
+                chosen_id, chosen_url = None, None
 
         if st.button("Book seat (try anyway)",  type="primary", key="book_anyway"):
             profile = st.session_state.profile
@@ -277,10 +238,11 @@ with book_col:
                     start_time_booking = to_libcal_label(start_time)
                     msg = book_seat_now(
                         chosen_id,
-                        rf"^{start_time_booking}(am|pm)?\b.*",
+                        start_label_re(start_time_booking),
                         y,
                         profile,
                     )
+                    clear_available_seats_cache()
                     st.success(msg)
                     if chosen_url:
                         st.markdown(chosen_url)
@@ -288,7 +250,7 @@ with book_col:
                     st.error(f"Booking failed: {e}")
 
     else:
-        options = {f"{name}": (seat_id, url) for (name, url, seat_id, power) in seats}
+        options = seat_options(tuple(seats))
 
         chosen_name = st.selectbox(
             "Choose a seat to book",
@@ -310,15 +272,86 @@ with book_col:
                     start_time_booking = to_libcal_label(start_time)
                     msg = book_seat_now(
                         chosen_id,
-                        rf"^{start_time_booking}(am|pm)?\b.*",
+                        start_label_re(start_time_booking),
                         y,
                         profile,
                     )
+                    clear_available_seats_cache()
                     st.success(msg)
                     st.markdown(chosen_url)
                 except Exception as e:
                     st.error(f"Booking failed: {e}")
 
+# Fragment: cancelling a check-in / stopping hunting only reruns this part,
+# not the seat queries above.
+@st.fragment
+def _automate_status():
+    # -----------------------
+    # Scheduled check-ins list
+    # -----------------------
+    st.markdown("### Scheduled & Status")
+    checkins = list_checkins(limit=100)  # all statuses
+    if not checkins:
+        st.info("No scheduled check-ins yet.")
+    else:
+        st.markdown("#### Cancel a pending check-in")
+        pending = [c for c in checkins if c["status"] == "pending"]
+        if not pending:
+            st.caption("No pending check-ins to cancel.")
+        else:
+            # one table + one cancel button (instead of widgets per row)
+            import pandas as pd
+
+            pending_df = pd.DataFrame(pending)[["id", "run_at_iso"]]
+            selection = st.dataframe(
+                pending_df,
+                hide_index=True,
+                on_select="rerun",
+                selection_mode="single-row",
+                key="pending_checkins",
+            )
+            selected_rows = selection.selection.rows
+            selected_id = int(pending_df.iloc[selected_rows[0]]["id"]) if selected_rows else None
+
+            if st.button("Cancel selected", key="cancel_selected_checkin", disabled=selected_id is None):
+                ok = cancel_checkin(checkin_id=selected_id)
+                if ok:
+                    st.success(f"Cancelled check-in {selected_id}.")
+                else:
+                    st.warning("Could not cancel (maybe it already started).")
+                st.rerun(scope="fragment")
+
+    # -----------------------
+    # Hunting status + stop
+    # -----------------------
+    st.divider()
+    st.markdown("#### Hunting status")
+
+    hs = hunting_status_cached()
+    if hs.get("active"):
+        st.success("🟢 Hunting is ACTIVE")
+        st.write(f"Started: {hs.get('created_at_iso')}")
+        st.write(f"Last run: {hs.get('last_run_at_iso')}")
+        if hs.get("error"):
+            st.error(f"Last error: {hs['error']}")
+        if hs.get("booked"):
+            st.success(f"Booked: {hs['booked']}")
+        if st.button("Stop hunting", type="primary", key="btn_stop_hunting"):
+            stop_hunting(reason="Stopped from UI")
+            hunting_status_cached.clear()
+            st.success("Hunting stopped.")
+            st.rerun(scope="fragment")
+    else:
+        st.info("🔴 Hunting is NOT active")
+        if hs.get("stopped_at_iso"):
+            st.caption(f"Stopped at: {hs.get('stopped_at_iso')}")
+        if hs.get("error"):
+            st.caption(f"Last error: {hs.get('error')}")
+        if hs.get("booked"):
+            st.caption(f"Last booked: {hs.get('booked')}")
+
+
+
 # ==========
 # Automate
 # ==========
@@ -421,6 +454,7 @@ with automate_col:
                                 hunting_areas=areas,
                                 profile=profile,
                                 try_book=False,   # <- preview only
+                                count_only=True,
                             )
                         except Exception as e:
                             st.error(f"Preview failed: {e}")
@@ -436,6 +470,7 @@ with automate_col:
                         try_book=True,
                     )
                     start_hunting(payload=payload)
+                    hunting_status_cached.clear()
 
                     # 3) Message: candidates + next run time
                     TZ = ZoneInfo("Europe/Amsterdam")
@@ -452,62 +487,7 @@ with automate_col:
 
                 st.session_state.show_hunt_form = False
     
-    # -----------------------
-    # Scheduled check-ins list
-    # -----------------------
-    st.markdown("### Scheduled & Status")
-    checkins = list_checkins(limit=100)  # all statuses
-    if not checkins:
-        st.info("No scheduled check-ins yet.")
-    else:
-        st.markdown("#### Cancel a pending check-in")
-        pending = [c for c in checkins if c["status"] == "pending"]
-        if not pending:
-            st.caption("No pending check-ins to cancel.")
-        else:
-            # show buttons per pending checkin
-            for c in pending:
-                c1, c2, c3 = st.columns([2, 2, 1])
-                with c1:
-                    st.write(f"ID **{c['id']}**")
-                with c2:
-                    st.write(f"Runs at **{c['run_at_iso']}**")
-                with c3:
-                    if st.button("Cancel", key=f"cancel_checkin_{c['id']}"):
-                        ok = cancel_checkin(checkin_id=c["id"])
-                        if ok:
-                            st.success(f"Cancelled check-in {c['id']}.")
-                        else:
-                            st.warning("Could not cancel (maybe it already started).")
-                        st.rerun()
-
-    # -----------------------
-    # Hunting status + stop
-    # -----------------------
-    st.divider()
-    st.markdown("#### Hunting status")
-
-    hs = get_hunting_status()
-    if hs.get("active"):
-        st.success("🟢 Hunting is ACTIVE")
-        st.write(f"Started: {hs.get('created_at_iso')}")
-        st.write(f"Last run: {hs.get('last_run_at_iso')}")
-        if hs.get("error"):
-            st.error(f"Last error: {hs['error']}")
-        if hs.get("booked"):
-            st.success(f"Booked: {hs['booked']}")
-        if st.button("Stop hunting", type="primary", key="btn_stop_hunting"):
-            stop_hunting(reason="Stopped from UI")
-            st.success("Hunting stopped.")
-            st.rerun()
-    else:
-        st.info("🔴 Hunting is NOT active")
-        if hs.get("stopped_at_iso"):
-            st.caption(f"Stopped at: {hs.get('stopped_at_iso')}")
-        if hs.get("error"):
-            st.caption(f"Last error: {hs.get('error')}")
-        if hs.get("booked"):
-            st.caption(f"Last booked: {hs.get('booked')}")
+    _automate_status()
 
 
 # ----------------------------
@@ -517,7 +497,7 @@ with automate_col:
 st.divider()
 st.markdown("### Data")
 
-if worker_is_running():
+if worker_running_cached():
     st.success(
         "Background worker is running — availability is updated automatically. "
         "Manual refresh is usually unnecessary."
@@ -528,6 +508,9 @@ else:
         "Automatic updates may not be running."
     )
 
+if st.toggle("Show database stats", value=False, key="show_db_stats"):
+    st.caption(f"Database contains {seats_count()} seats.")
+
 st.caption(
     "Availability is normally updated automatically in the background. "
     "Use this only if you want to force a manual refresh."
@@ -543,13 +526,7 @@ with st.expander("Advanced: force refresh availability", expanded=False):
         status = st.empty()
         started = time.time()
 
-        def cb(i, total, seat_id, failed):
-            pct = int((i / total) * 100) if total else 0
-            progress.progress(pct)
-            status.write(
-                f"Refreshing availability {i}/{total} "
-                f"(failed: {failed}) — last seat: {seat_id}"
-            )
+        cb = throttled_progress_cb(progress, status, "Refreshing availability")
 
         with st.spinner("Forcing availability refresh…"):
             total, failed = update_availability_for_date(
@@ -564,3 +541,6 @@ with st.expander("Advanced: force refresh availability", expanded=False):
             f"Processed {total} seats, failed {failed}. "
             f"Took {elapsed:.1f}s."
         )
+
+        load_all_seats_from_db.clear()
+        st.session_state.pop("all_seats", None)
@@ -0,0 +1,155 @@
+# helpers.py
+# Helpers for app.py. Kept in an imported module so Streamlit doesn't re-define
+# them on every rerun of the app script.
+import json
+import time
+import sqlite3
+from pathlib import Path
+
+import streamlit as st
+
+from libcal_bot.paths import DB_PATH
+from libcal_bot.fetch_availability.db import get_conn
+from libcal_bot.app.libcal_actions import worker_is_running
+from libcal_bot.worker.tasks import get_hunting_status
+
+
+# ----------------------------
+# Profile handling
+# ----------------------------
+
+PROFILE_PATH = Path(__file__).resolve().parent / "user_profile.json"
+
+
+DEFAULT_PROFILE = {
+    "first_name": "",
+    "last_name": "",
+    "email": "",
+    "phone": "",
+    "student_number": "",
+}
+
+
+def load_profile() -> dict:
+    try:
+        with PROFILE_PATH.open("rb") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return dict(DEFAULT_PROFILE)
+
+
+def profile_mtime_ns() -> int:
+    try:
+        return PROFILE_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+@st.cache_data(show_spinner=False)
+def load_profile_cached(mtime_ns: int) -> dict:
+    # keyed on the file's mtime, so edits outside the app are picked up too;
+    # cache_data hands every caller its own copy
+    return load_profile()
+
+
+def save_profile(profile: dict) -> None:
+    with PROFILE_PATH.open("w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2)
+    load_profile_cached.clear()
+
+
+# ----------------------------
+# Time options
+# ----------------------------
+
+# 09:00 … 23:30 in half hours, plus midnight as last possible end time
+OPTIONS = tuple(f"{h:02d}:{m:02d}" for h in range(9, 24) for m in (0, 30)) + ("00:00",)
+OPTIONS_IDX = {v: i for i, v in enumerate(OPTIONS)}
+# possible end times per start time (everything after it)
+END_OPTIONS = {v: OPTIONS[i + 1:] for i, v in enumerate(OPTIONS)}
+
+
+def end_option_index(start: str, end: str) -> int | None:
+    # positie in END_OPTIONS[start] = positie in OPTIONS - (positie van start + 1)
+    i = OPTIONS_IDX.get(end, -1) - (OPTIONS_IDX[start] + 1)
+    return i if i >= 0 else None
+
+
+AREA_OPTIONS = [
+    "1.B",
+    "2.A", "2.B", "2.C",
+    "3.A", "3.B", "3.C",
+    "4.A", "4.B", "4.C",
+]
+
+POWER_OPTIONS = ["Power available", "No power"]  # you can select one or both
+
+
+# ----------------------------
+# Progress helpers
+# ----------------------------
+
+def throttled_progress_cb(progress, status, label: str, min_interval: float = 0.1):
+    """
+    progress_cb(i, total, seat_id, failed) that only pushes UI updates when the
+    percentage changes or at most every `min_interval` seconds (always on the last item).
+    """
+    last_pct = -1
+    last_t = 0.0
+
+    def cb(i, total, seat_id, failed):
+        nonlocal last_pct, last_t
+        pct = int((i / total) * 100) if total else 0
+        if pct != last_pct:
+            progress.progress(pct)
+            last_pct = pct
+
+        now = time.monotonic()
+        if now - last_t > min_interval or i == total:
+            status.write(
+                f"{label} {i}/{total} "
+                f"(failed: {failed}) — last seat: {seat_id}"
+            )
+            last_t = now
+
+    return cb
+
+
+# ----------------------------
+# Database readiness check
+# ----------------------------
+
+def db_ready() -> tuple[bool, str]:
+    # pooled connectie: DB + schema worden bij aanmaken altijd gemaakt (dus geen sqlite_master probe nodig)
+    try:
+        with get_conn(str(DB_PATH)) as conn:
+            has_seats = conn.execute("SELECT EXISTS(SELECT 1 FROM seats)").fetchone()[0]
+        if not has_seats:
+            return False, "Database bestaat, maar seats zijn nog leeg. Initialiseer dataset."
+        return True, "Database OK."
+    except sqlite3.OperationalError as e:
+        if "no such table" in str(e):
+            return False, "Database schema ontbreekt (geen seats tabel)."
+        return False, f"Database error: {e}"
+    except sqlite3.Error as e:
+        return False, f"Database error: {e}"
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def db_ready_cached() -> tuple[bool, str]:
+    return db_ready()
+
+
+@st.cache_data(ttl=2, show_spinner=False)
+def worker_running_cached() -> bool:
+    return worker_is_running()
+
+
+@st.cache_data(ttl=2, show_spinner=False)
+def hunting_status_cached() -> dict:
+    return get_hunting_status()
+
+
+@st.cache_data(show_spinner=False)
+def seat_options(seats_tuple: tuple) -> dict:
+    return {f"{name}": (seat_id, url) for (name, url, seat_id, _power) in seats_tuple}
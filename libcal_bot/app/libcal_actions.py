@@ -1,68 +1,109 @@
 # libcal_actions.py
 from __future__ import annotations
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
 from datetime import datetime, timedelta
 import streamlit as st
 import time
 import requests
-import sqlite3
 import subprocess
 from pathlib import Path
 from zoneinfo import ZoneInfo
-from typing import List, Tuple, Optional, Sequence
+from typing import Callable, NamedTuple, Optional, Sequence
 from libcal_bot.paths import DB_PATH
 from libcal_bot.fetch_availability.fetch_all_seats import init_static_data, fetch_availability, fetch_slots_with_retry, _make_libcal_session
-from libcal_bot.fetch_availability.db import init_db
+from libcal_bot.fetch_availability.db import STATUS_AVAILABLE, get_conn
 from libcal_bot.book_seats.book_seat import book_seat_now as _book
-from libcal_bot.fetch_availability.fetch_one_seat import status_from_classname
 from libcal_bot.book_seats.automatic_checkin import checkin_now
-from libcal_bot.find_seats.snipe_seats import snipable_seats, observe_seat
+from libcal_bot.find_seats.snipe_seats import snipable_seats, count_snipable_seats, observe_seat
 
-SQL_FULLY_AVAILABLE = """
-WITH interval_slots AS (
-  SELECT start_iso, end_iso
+# number of distinct slots in [x, y]; computed once and bound as n below
+SQL_INTERVAL_SLOTS = """
+SELECT COUNT(*) FROM (
+  SELECT 1
   FROM timeslots
-  WHERE start_iso >= :x
-    AND end_iso   <= :y
+  WHERE start_iso >= ?
+    AND start_iso <  ?
+    AND end_iso   <= ?
   GROUP BY start_iso, end_iso
-),
-needed AS (SELECT COUNT(*) AS n FROM interval_slots),
-per_seat AS (
-  SELECT seat_id, COUNT(*) AS k
-  FROM timeslots
-  WHERE status = 'AVAILABLE'
-    AND start_iso >= :x
-    AND end_iso   <= :y
-  GROUP BY seat_id
-)
+);
+"""
+
+AVAILABLE_SEAT_COLUMNS = ["seat_name", "seat_url", "seat_id", "power_available"]
+
+# single pass over AVAILABLE slots: a seat is fully available iff it has all n of them
+# params: (x, y, y, n)
+# start_iso < y is implied by end_iso <= y but bounds the index range on both sides
+# (without it every later slot is scanned). No INDEXED BY: without sqlite_stat1 the
+# planner range-scans the covering idx_timeslots_window (fastest on short windows),
+# with stats it may skip-scan the primary key instead (better on day-long windows).
+SQL_FULLY_AVAILABLE = f"""
 SELECT s.seat_name, s.seat_url, s.seat_id, s.power_available
-FROM per_seat p
-JOIN needed n
-JOIN seats s ON s.seat_id = p.seat_id
-WHERE p.k = n.n AND n.n > 0
+FROM timeslots t
+JOIN seats s ON s.seat_id = t.seat_id
+WHERE t.status = {STATUS_AVAILABLE}
+  AND t.start_iso >= ?
+  AND t.start_iso <  ?
+  AND t.end_iso   <= ?
+GROUP BY t.seat_id
+HAVING COUNT(*) = ?
 ORDER BY
   (s.seat_name IS NULL) ASC,
   s.seat_name ASC,
   s.seat_id ASC;
 """
 
-def get_available_seats(x: str, y: str) -> List[Tuple[Optional[str], str, int, Optional[int]]]:
+def _db_signature() -> tuple[int, int]:
+    """
+    Changes whenever the DB is written (WAL mode: writes land in the -wal file first).
+    """
+    sig = []
+    for p in (Path(DB_PATH), Path(f"{DB_PATH}-wal")):
+        try:
+            sig.append(p.stat().st_mtime_ns)
+        except FileNotFoundError:
+            sig.append(0)
+    return sig[0], sig[1]
+
+# db_sig is part of the key, so every write adds entries: keep the cache bounded
+@st.cache_data(ttl=60, max_entries=64, show_spinner=False)
+def _cached_available(x: str, y: str, db_sig: tuple[int, int], as_frame: bool = False):
+    with get_conn() as conn:
+        n = conn.execute(SQL_INTERVAL_SLOTS, (x, y, y)).fetchone()[0]
+        if as_frame:
+            import pandas as pd  # lazy: only the Seats table reads a DataFrame
+
+            if n == 0:
+                return pd.DataFrame(columns=AVAILABLE_SEAT_COLUMNS)
+            return pd.read_sql_query(SQL_FULLY_AVAILABLE, conn, params=(x, y, y, n))
+        if n == 0:
+            return []
+        return conn.execute(SQL_FULLY_AVAILABLE, (x, y, y, n)).fetchall()
+
+def get_available_seats(x: str, y: str, as_frame: bool = False):
     """
-    Returns rows as (seat_name, seat_url, seat_id).
+    Returns rows as (seat_name, seat_url, seat_id, power_available).
     seat_name may be None if not filled in the DB.
+    as_frame=True: a pandas DataFrame with those columns instead (read straight
+    from the query, no Python rows in between).
+    Cached per (x, y) until the DB file changes (or 60s).
     """
-    conn = sqlite3.connect(str(DB_PATH))
-    try:
-        return conn.execute(SQL_FULLY_AVAILABLE, {"x": x, "y": y}).fetchall()
-    finally:
-        conn.close()
+    return _cached_available(x, y, _db_signature(), as_frame)
+
+def clear_available_seats_cache() -> None:
+    _cached_available.clear()
 
 def _seats_count(db_path: str) -> int:
-    conn = init_db(db_path)
-    try:
+    with get_conn(db_path) as conn:
         cur = conn.execute("SELECT COUNT(*) FROM seats")
         return int(cur.fetchone()[0])
-    finally:
-        conn.close()
+
+def seats_count(db_path: str | None = None) -> int:
+    """
+    Exact number of seats in the DB (full count; only call when actually shown).
+    """
+    return _seats_count(str(DB_PATH) if db_path is None else db_path)
 
 def update_availability_for_date(
     start_date: str,
@@ -75,15 +116,20 @@ def update_availability_for_date(
 
     if _seats_count(db_path) == 0:
         init_static_data(db_path=db_path, progress_cb=progress_cb)
+        load_all_seats_from_db.clear()
 
-    return fetch_availability(
+    result = fetch_availability(
         start_date,
         end_date,
         db_path=db_path,
         progress_cb=progress_cb,
     )
+    clear_available_seats_cache()
+    _cached_candidates.clear()
+    return result
 
 
+@lru_cache(maxsize=128)
 def to_libcal_label(start_time_24h: str) -> str:
     h, m = start_time_24h.split(":")
     h = int(h)
@@ -97,27 +143,37 @@ def to_libcal_label(start_time_24h: str) -> str:
     return f"{h12}:{m:02d}{suffix}"
 
 
-def book_seat_now(seat_id: int, start_label_regex: str, end_value: str, profile: dict) -> str:
+@lru_cache(maxsize=128)
+def start_label_re(label: str) -> re.Pattern:
+    """
+    Compiled start-slot label regex, e.g. "9:30am" -> ^9:30am(am|pm)?\\b.*
+    Cached so repeated bookings for the same start time reuse the pattern.
+    """
+    return re.compile(rf"^{re.escape(label)}(am|pm)?\b.*", re.IGNORECASE)
+
+
+def book_seat_now(seat_id: int, start_label_regex: str | re.Pattern, end_value: str, profile: dict) -> str:
     return _book(seat_id, start_label_regex, end_value, profile)
 
-def _slot_is_available(slots: list[dict], start_iso: str, end_iso: str) -> bool:
-    for it in slots:
-        if it.get("start") == start_iso and it.get("end") == end_iso:
-            return status_from_classname(it.get("className", "")) == "AVAILABLE"
-    return False
+class SeatDirectory(NamedTuple):
+    """Parallel tuples, sorted by seat name: names[i] belongs to ids[i] / urls[i]."""
+    names: tuple[str, ...]
+    ids: tuple[int, ...]
+    urls: tuple[str, ...]
 
-@st.cache_data(show_spinner=False)
-def load_all_seats_from_db():
-    conn = sqlite3.connect(str(DB_PATH))
-    try:
+
+# seats only change via init_static_data, which clears this cache
+@st.cache_data(ttl=3600, show_spinner=False)
+def load_all_seats_from_db() -> SeatDirectory:
+    with get_conn() as conn:
         rows = conn.execute(
             "SELECT seat_name, seat_id, seat_url FROM seats WHERE seat_name IS NOT NULL ORDER BY seat_name ASC"
         ).fetchall()
-    finally:
-        conn.close()
 
-    # mapping: seat_name -> (seat_id, seat_url)
-    return {name: (seat_id, seat_url) for (name, seat_id, seat_url) in rows}
+    if not rows:
+        return SeatDirectory((), (), ())
+    names, ids, urls = zip(*rows)
+    return SeatDirectory(names, ids, urls)
 
 
 def run_checkin_now(code: str) -> str:
@@ -127,6 +183,78 @@ def run_checkin_now(code: str) -> str:
     return checkin_now(code, headless=True)
 
 
+@st.cache_resource(show_spinner=False)
+def _libcal_session() -> requests.Session:
+    """
+    One warmed-up session (cookies + keep-alive pool) shared by all hunts in this process.
+    Cleared on a 403 so the next hunt fetches fresh cookies.
+    """
+    s = _make_libcal_session(pool_size=16)
+    # Belangrijk: eerst een GET om cookies/session te krijgen (helpt vaak tegen 403)
+    s.get("https://libcal.rug.nl/seats", timeout=30)
+    return s
+
+
+@st.cache_data(ttl=30, max_entries=32, show_spinner=False)
+def _cached_candidates(
+    start_iso: str,
+    power: tuple[str, ...],
+    areas: tuple[str, ...],
+    db_sig: tuple[int, int],
+) -> list[int]:
+    # db_sig: new data from the worker/refresh invalidates the candidates right away
+    return snipable_seats(
+        start_time=datetime.fromisoformat(start_iso),
+        hunting_zone=(list(power), list(areas)),
+        db_path=str(DB_PATH),
+    )
+
+
+def _first_hit(
+    candidates: Sequence[int],
+    probe: Callable[[int], Optional[int]],
+    max_workers: int = 6,
+) -> tuple[Optional[int], int]:
+    """
+    Runs probe() over candidates with a sliding window of max_workers.
+    Returns (first seat_id in candidates order for which probe hit, #probes done).
+    No new probes are submitted once a hit is known; in-flight probes for
+    lower-priority seats are ignored.
+    """
+    results: dict[int, bool] = {}  # candidate index -> hit
+    next_i = 0   # next candidate index to submit
+    head = 0     # lowest candidate index whose result is still unknown
+    hit_at: Optional[int] = None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        pending = {}
+        while True:
+            while hit_at is None and next_i < len(candidates) and len(pending) < max_workers:
+                pending[ex.submit(probe, candidates[next_i])] = next_i
+                next_i += 1
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                i = pending.pop(fut)
+                results[i] = fut.result() is not None
+                if results[i] and (hit_at is None or i < hit_at):
+                    hit_at = i
+
+            # advance over the known misses; stop at the first hit in priority order
+            while head in results and not results[head]:
+                head += 1
+            if hit_at is not None and head == hit_at:
+                for fut in pending:
+                    fut.cancel()
+                break
+
+    if hit_at is None:
+        return None, len(results)
+    return candidates[hit_at], len(results)
+
+
 def run_hunt_now(
     start_dt: datetime,
     end_dt: datetime,
@@ -134,6 +262,7 @@ def run_hunt_now(
     hunting_areas: Sequence[str],
     profile: dict,
     try_book: bool = True,
+    count_only: bool = False,
 ) -> dict:
     """
     Immediate hunting run (no scheduling yet).
@@ -142,14 +271,25 @@ def run_hunt_now(
       2) live-check each seat via observe_seat
       3) (optional) book the first valid seat
 
+    count_only=True: only count the snipable seats in SQL (preview), no live checks.
+
     Returns a dict with status + optional booked seat.
     """
     hunting_zone = (hunting_power, hunting_areas)
 
-    candidates = snipable_seats(
-        start_time=start_dt,
-        hunting_zone=hunting_zone,
-        db_path=str(DB_PATH),
+    if count_only:
+        n = count_snipable_seats(
+            start_time=start_dt,
+            hunting_zone=hunting_zone,
+            db_path=str(DB_PATH),
+        )
+        return {"ok": True, "candidates": n, "checked": 0, "found": None, "booked": None, "msg": f"{n} snipable seat(s) in this zone."}
+
+    candidates = _cached_candidates(
+        start_dt.isoformat(),
+        tuple(hunting_power),
+        tuple(hunting_areas),
+        _db_signature(),
     )
 
     # If nothing to hunt, stop early
@@ -160,26 +300,24 @@ def run_hunt_now(
     start_date = start_dt.date().isoformat()
     end_date = (start_dt.date() + timedelta(days=1)).isoformat()
 
-    checked = 0
-    found_seat_id: Optional[int] = None
-
-    with _make_libcal_session() as session:
-        # Belangrijk: eerst een GET om cookies/session te krijgen (helpt vaak tegen 403)
-        session.get("https://libcal.rug.nl/seats", timeout=30)
-
-        for seat_id in candidates:
-            checked += 1
-            ok = observe_seat(
+    session = _libcal_session()
+    try:
+        found_seat_id, checked = _first_hit(
+            candidates,
+            lambda seat_id: observe_seat(
                 seat_id=seat_id,
                 start_time=start_dt,
                 end_time=end_dt,
                 start_date=start_date,
                 end_date=end_date,
                 session=session,
-            )
-            if ok is not None:
-                found_seat_id = seat_id
-                break
+            ),
+        )
+    except requests.HTTPError as e:
+        if e.response is not None and e.response.status_code == 403:
+            # cookies probably expired: re-warm on the next hunt
+            _libcal_session.clear()
+        raise
 
     if found_seat_id is None:
         return {
@@ -194,8 +332,8 @@ def run_hunt_now(
     # Optionally book immediately
     booked_msg = None
     if try_book:
-        # booking expects regex label like "^09:30(am|pm)?\b.*"
-        start_label_regex = rf"^{start_dt.strftime('%H:%M')}(am|pm)?\b.*"
+        # same compiled label pattern as the manual booking path ("9:30am")
+        start_label_regex = start_label_re(to_libcal_label(start_dt.strftime('%H:%M')))
         end_value = f"{end_dt.date().isoformat()} {end_dt.strftime('%H:%M')}:00"
 
         booked_msg = book_seat_now(found_seat_id, start_label_regex, end_value, profile)
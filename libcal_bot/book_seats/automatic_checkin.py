@@ -1,11 +1,41 @@
 # libcal_bot/book_seats/automatic_checkin.py
 from __future__ import annotations
 
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from libcal_bot.book_seats.browser import run_on_page
 
 
 CHECKIN_URL = "https://libcal.rug.nl/r/checkin"
 
+# Typical outcomes (guessing common phrasing); plain text, no regex metacharacters
+SUCCESS_MARKERS = (
+    "checked in",
+    "success",
+    "you are checked in",
+    "check-in complete",
+)
+ERROR_MARKERS = (
+    "invalid",
+    "not found",
+    "expired",
+    "error",
+    "already checked in",
+    "unable",
+)
+_SUCCESS_JS = "/%s/" % "|".join(SUCCESS_MARKERS)
+_ERROR_JS = "/%s/" % "|".join(ERROR_MARKERS)
+# same markers, for the in-page wait
+_RESULT_JS = "() => /%s/i.test(document.body.innerText)" % "|".join(SUCCESS_MARKERS + ERROR_MARKERS)
+# classify in the page: one round-trip instead of shipping the whole body text back
+_CLASSIFY_JS = """() => {
+  const t = document.body.innerText.toLowerCase();
+  if (%s.test(t) && !t.includes("invalid")) return "ok";
+  if (t.includes("already checked in")) return "already";
+  if (%s.test(t)) return "error";
+  return "unknown";
+}""" % (_SUCCESS_JS, _ERROR_JS)
+
 
 class CheckinError(RuntimeError):
     pass
@@ -13,7 +43,7 @@ class CheckinError(RuntimeError):
 
 def checkin_now(code: str, headless: bool = True, slow_mo: int = 0) -> str:
     """
-    Opens https://libcal.rug.nl/r/checkin, enters the check-in code, submits, and closes the browser.
+    Opens https://libcal.rug.nl/r/checkin, enters the check-in code and submits (on a fresh page of the shared browser).
 
     Returns a short status message on success.
     Raises CheckinError on failure.
@@ -22,84 +52,68 @@ def checkin_now(code: str, headless: bool = True, slow_mo: int = 0) -> str:
     if not code:
         raise CheckinError("Empty check-in code.")
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=headless, slow_mo=slow_mo)
-        context = browser.new_context()
-        page = context.new_page()
-
-        try:
-            page.goto(CHECKIN_URL, wait_until="domcontentloaded", timeout=30_000)
-
-            # --- Find the input field ---
-            # LibCal pages can vary; try a few robust selectors.
-            input_locator = (
-                page.locator("input[name='code']").first
-                .or_(page.locator("input#code").first)
-                .or_(page.locator("input[type='text']").first)
-            )
-
-            try:
-                input_locator.wait_for(state="visible", timeout=10_000)
-            except PlaywrightTimeoutError:
-                raise CheckinError("Could not find a visible check-in input field on the page.")
-
-            input_locator.fill(code)
-
-            # --- Find a submit/check-in button ---
-            # Try button with text first; fallback to submit input/button.
-            button_locator = (
-                page.get_by_role("button", name="Check In").first
-                .or_(page.get_by_role("button", name="Check in").first)
-                .or_(page.locator("button[type='submit']").first)
-                .or_(page.locator("input[type='submit']").first)
-            )
-
-            try:
-                button_locator.wait_for(state="visible", timeout=5_000)
-            except PlaywrightTimeoutError:
-                raise CheckinError("Could not find a Check In / submit button.")
-
-            button_locator.click()
-
-            # --- Determine result ---
-            # We don't know exact DOM/messages, so we look for common success/failure cues.
-            # Adjust these strings if you see different text in the page.
-            page.wait_for_timeout(1200)  # small wait for response render
-
-            body_text = page.locator("body").inner_text().lower()
-
-            # Typical outcomes (guessing common phrasing)
-            success_markers = [
-                "checked in",
-                "success",
-                "you are checked in",
-                "check-in complete",
-            ]
-            error_markers = [
-                "invalid",
-                "not found",
-                "expired",
-                "error",
-                "already checked in",
-                "unable",
-            ]
-
-            if any(m in body_text for m in success_markers) and "invalid" not in body_text:
-                return "✅ Check-in successful."
-
-            # If it contains "already checked in", treat as OK-ish:
-            if "already checked in" in body_text:
-                return "✅ Already checked in."
-
-            if any(m in body_text for m in error_markers):
-                raise CheckinError("Check-in failed (page shows an error).")
-
-            # If we can't confidently parse: return neutral but not error
-            return "⚠️ Submitted check-in code, but could not confirm result from page text. Please verify manually."
-
-        finally:
-            context.close()
-            browser.close()
+    return run_on_page(_checkin_on_page, code, headless=headless, slow_mo=slow_mo)
+
+
+def _checkin_on_page(page, code: str) -> str:
+    page.goto(CHECKIN_URL, wait_until="domcontentloaded", timeout=30_000)
+
+    # --- Find the input field ---
+    # LibCal pages can vary; try a few robust selectors.
+    input_locator = (
+        page.locator("input[name='code']").first
+        .or_(page.locator("input#code").first)
+        .or_(page.locator("input[type='text']").first)
+    )
+
+    try:
+        input_locator.wait_for(state="visible", timeout=10_000)
+    except PlaywrightTimeoutError:
+        raise CheckinError("Could not find a visible check-in input field on the page.")
+
+    input_locator.fill(code)
+
+    # --- Find a submit/check-in button ---
+    # Try button with text first; fallback to submit input/button.
+    button_locator = (
+        page.get_by_role("button", name="Check In").first
+        .or_(page.get_by_role("button", name="Check in").first)
+        .or_(page.locator("button[type='submit']").first)
+        .or_(page.locator("input[type='submit']").first)
+    )
+
+    try:
+        button_locator.wait_for(state="visible", timeout=5_000)
+    except PlaywrightTimeoutError:
+        raise CheckinError("Could not find a Check In / submit button.")
+
+    button_locator.click()
+
+    # --- Determine result ---
+    # We don't know exact DOM/messages, so we look for common success/failure cues.
+    # Adjust these strings if you see different text in the page.
+    # wait until the response shows one of the markers below (instead of a fixed sleep);
+    # on timeout we still parse whatever is on the page
+    try:
+        page.wait_for_function(_RESULT_JS, timeout=5_000)
+    except PlaywrightTimeoutError:
+        pass
+
+    result = page.evaluate(_CLASSIFY_JS)
+
+    if result == "ok":
+        return "✅ Check-in successful."
+
+    # If it contains "already checked in", treat as OK-ish:
+    if result == "already":
+        return "✅ Already checked in."
+
+    if result == "error":
+        raise CheckinError("Check-in failed (page shows an error).")
+
+    # If we can't confidently parse: return neutral but not error
+    return "⚠️ Submitted check-in code, but could not confirm result from page text. Please verify manually."
+
 
 
 def main():
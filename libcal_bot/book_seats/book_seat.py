@@ -1,9 +1,26 @@
 from __future__ import annotations
 
 import re
-from playwright.sync_api import sync_playwright
 import os
 
+from playwright.sync_api import expect
+
+from libcal_bot.book_seats.browser import run_on_page
+
+
+_SUBMIT_TIMES_RE = re.compile(r"Submit\s*Times?", re.I)
+_CONTINUE_RE = re.compile(r"Continue", re.I)
+_SUBMIT_BOOKING_RE = re.compile(r"Submit my Booking", re.I)
+
+# profile key -> (textbox label, name used in error messages)
+_FIELDS = {
+    "first_name": (re.compile(r"First Name", re.I), "First Name"),
+    "last_name": (re.compile(r"Last Name", re.I), "Last Name"),
+    "email": (re.compile(r"Email", re.I), "Email"),
+    "phone": (re.compile(r"phonenumber", re.I), "Phone number"),
+    "student_number": (re.compile(r"S- or P-number", re.I), "S/P number"),
+}
+
 
 def fail(page, reason: str):
     raise RuntimeError(f"Booking failed, because {reason}")
@@ -11,100 +28,95 @@ def fail(page, reason: str):
 
 def book_seat_now(
     seat_id: int,
-    start_label_regex: str,
+    start_label_regex: str | re.Pattern,
     end_value: str,
     profile: dict
 ) -> str:
-    url = f"https://libcal.rug.nl/seat/{seat_id}"
-
     # validate profile keys early
-    required_keys = ["first_name", "last_name", "email", "phone", "student_number"]
-    missing = [k for k in required_keys if not profile.get(k)]
+    missing = [k for k in _FIELDS if not profile.get(k)]
     if missing:
         raise RuntimeError(f"Booking failed, because missing profile fields: {', '.join(missing)}")
 
-    with sync_playwright() as p:
-        slow_mo = int(os.getenv("SLOW_MO", "0"))
-        browser = p.chromium.launch(headless=True, slow_mo=slow_mo)
-        page = browser.new_page()
+    slow_mo = int(os.getenv("SLOW_MO", "0"))
+    return run_on_page(_book_on_page, seat_id, start_label_regex, end_value, profile, slow_mo=slow_mo)
+
 
+def _book_on_page(
+    page,
+    seat_id: int,
+    start_label_regex: str | re.Pattern,
+    end_value: str,
+    profile: dict,
+) -> str:
+    url = f"https://libcal.rug.nl/seat/{seat_id}"
+    page.goto(url, wait_until="networkidle")
+
+    # 1) find start slot
+    start_re = start_label_regex
+    if isinstance(start_re, str):
+        start_re = re.compile(start_re, re.I)
+    start_loc = page.get_by_label(start_re)
+    if start_loc.count() == 0:
+        fail(page, f"start timeslot '{start_re.pattern}' was not found on the page")
+
+    # 2) click start, wait for the end dropdown to appear; one forced re-click if it doesn't
+    end_select_locator = page.locator("select").filter(
+        has=page.locator(f'option[value="{end_value}"]')
+    )
+
+    try:
+        start_loc.first.scroll_into_view_if_needed(timeout=10)
+    except Exception:
+        pass
+
+    for force in (False, True):
         try:
-            page.goto(url, wait_until="networkidle")
-
-            # 1) find start slot
-            start_loc = page.get_by_label(re.compile(start_label_regex))
-            if start_loc.count() == 0:
-                fail(page, f"start timeslot '{start_label_regex}' was not found on the page")
-
-            # 2) click start until end dropdown appears
-            end_select_locator = page.locator("select").filter(
-                has=page.locator(f'option[value="{end_value}"]')
-            )
-
-            for _ in range(3):
-                try:
-                    start_loc.first.scroll_into_view_if_needed(timeout=10)
-                except Exception:
-                    pass
-
-                try:
-                    start_loc.first.click(timeout=10)
-                except Exception:
-                    try:
-                        start_loc.first.click(timeout=10, force=True)
-                    except Exception:
-                        pass
-
-                page.wait_for_timeout(300)
-
-                if end_select_locator.count() > 0:
-                    break
-
-            if end_select_locator.count() == 0:
-                fail(page, "end-time dropdown did not appear after selecting start time (click may not have registered or slot is not bookable)")
-
-            end_select = end_select_locator.first
-            try:
-                end_select.select_option(end_value, timeout=10)
-            except Exception:
-                fail(page, f"could not select end time '{end_value}' (slot/end time not available)")
-
-            # 3) submit times + continue
-            submit_times = page.get_by_role("button", name=re.compile(r"Submit\s*Times?", re.I))
-            if submit_times.count() == 0:
-                fail(page, "could not find 'Submit Times' button (page flow changed)")
-            submit_times.first.click(timeout=10)
-
-            cont = page.get_by_role("button", name=re.compile(r"Continue", re.I))
-            if cont.count() == 0:
-                fail(page, "could not find 'Continue' button (page flow changed)")
-            cont.first.click(timeout=10)
-
-            # 4) fill form
-            def fill_required(label_regex: str, value: str, field_name: str):
-                loc = page.get_by_role("textbox", name=re.compile(label_regex, re.I))
-                if loc.count() == 0:
-                    fail(page, f"required field '{field_name}' not found")
-                loc.first.fill(value, timeout=10)
-
-            fill_required(r"First Name", profile["first_name"], "First Name")
-            fill_required(r"Last Name", profile["last_name"], "Last Name")
-            fill_required(r"Email", profile["email"], "Email")
-            fill_required(r"phonenumber", profile["phone"], "Phone number")
-            fill_required(r"S- or P-number", profile["student_number"], "S/P number")
-
-            # 5) submit booking
-            submit_booking = page.get_by_role("button", name=re.compile(r"Submit my Booking", re.I))
-            if submit_booking.count() == 0:
-                fail(page, "could not find 'Submit my Booking' button")
-            submit_booking.first.click(timeout=10)
-
-            page.wait_for_load_state("networkidle")
-
-            body = page.inner_text("body").lower()
-            if "confirmed" in body or "success" in body or "reservation" in body:
-                return f"Booked seat {seat_id} successfully."
-            return f"Submitted booking for seat {seat_id}, but no clear confirmation text was found (check booking_result.png)."
-
-        finally:
-            browser.close()
+            start_loc.first.click(timeout=10, force=force)
+        except Exception:
+            pass
+
+        try:
+            expect(end_select_locator).not_to_have_count(0, timeout=3_000)
+            break
+        except AssertionError:
+            continue
+
+    if end_select_locator.count() == 0:
+        fail(page, "end-time dropdown did not appear after selecting start time (click may not have registered or slot is not bookable)")
+
+    end_select = end_select_locator.first
+    try:
+        end_select.select_option(end_value, timeout=10)
+    except Exception:
+        fail(page, f"could not select end time '{end_value}' (slot/end time not available)")
+
+    # 3) submit times + continue
+    submit_times = page.get_by_role("button", name=_SUBMIT_TIMES_RE)
+    if submit_times.count() == 0:
+        fail(page, "could not find 'Submit Times' button (page flow changed)")
+    submit_times.first.click(timeout=10)
+
+    cont = page.get_by_role("button", name=_CONTINUE_RE)
+    if cont.count() == 0:
+        fail(page, "could not find 'Continue' button (page flow changed)")
+    cont.first.click(timeout=10)
+
+    # 4) fill form
+    for key, (label_re, field_name) in _FIELDS.items():
+        loc = page.get_by_role("textbox", name=label_re)
+        if loc.count() == 0:
+            fail(page, f"required field '{field_name}' not found")
+        loc.first.fill(profile[key], timeout=10)
+
+    # 5) submit booking
+    submit_booking = page.get_by_role("button", name=_SUBMIT_BOOKING_RE)
+    if submit_booking.count() == 0:
+        fail(page, "could not find 'Submit my Booking' button")
+    submit_booking.first.click(timeout=10)
+
+    page.wait_for_load_state("networkidle")
+
+    if page.evaluate("() => /confirmed|success|reservation/i.test(document.body.innerText)"):
+        return f"Booked seat {seat_id} successfully."
+    return f"Submitted booking for seat {seat_id}, but no clear confirmation text was found (check booking_result.png)."
+
@@ -0,0 +1,80 @@
+# libcal_bot/book_seats/browser.py
+from __future__ import annotations
+
+import atexit
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable
+
+from playwright.sync_api import sync_playwright
+
+
+# The Playwright sync API is bound to the thread that started it, while bookings
+# come from Streamlit script threads and check-ins from the worker's job threads.
+# So one daemon thread owns the driver + browser(s) and runs every action; callers
+# only get a fresh context/page per action. Actions are serialized, which is fine
+# for a handful of bookings/check-ins.
+_JOBS: queue.Queue = queue.Queue()
+_THREAD: threading.Thread | None = None
+_THREAD_LOCK = threading.Lock()
+
+
+def _browser_loop() -> None:
+    pw = None
+    browsers: dict[tuple, Any] = {}  # launch options -> Browser
+    try:
+        while True:
+            job = _JOBS.get()
+            if job is None:
+                return
+            fn, args, launch_kw, fut = job
+            if not fut.set_running_or_notify_cancel():
+                continue
+            try:
+                if pw is None:
+                    pw = sync_playwright().start()
+                key = tuple(sorted(launch_kw.items()))
+                browser = browsers.get(key)
+                if browser is None or not browser.is_connected():
+                    browser = browsers[key] = pw.chromium.launch(**launch_kw)
+
+                context = browser.new_context()
+                try:
+                    fut.set_result(fn(context.new_page(), *args))
+                finally:
+                    context.close()
+            except BaseException as e:
+                fut.set_exception(e)
+    finally:
+        for browser in browsers.values():
+            try:
+                browser.close()
+            except Exception:
+                pass
+        if pw is not None:
+            pw.stop()
+
+
+def run_on_page(fn: Callable[..., Any], *args, headless: bool = True, slow_mo: int = 0) -> Any:
+    """
+    Runs fn(page, *args) on a new page of the shared browser and returns its result
+    (exceptions raised by fn are re-raised here). Blocks until done.
+    """
+    global _THREAD
+    with _THREAD_LOCK:
+        if _THREAD is None or not _THREAD.is_alive():
+            _THREAD = threading.Thread(target=_browser_loop, name="playwright", daemon=True)
+            _THREAD.start()
+
+    fut: Future = Future()
+    _JOBS.put((fn, args, {"headless": headless, "slow_mo": slow_mo}, fut))
+    return fut.result()
+
+
+@atexit.register
+def _close_browser() -> None:
+    # daemon threads are still alive while atexit handlers run
+    if _THREAD is not None and _THREAD.is_alive():
+        _JOBS.put(None)
+        _THREAD.join(timeout=10)
@@ -1,42 +1,230 @@
 # db.py
+import atexit
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 from libcal_bot.paths import DB_PATH
 
-SCHEMA = """
-PRAGMA foreign_keys = ON;
-
-CREATE TABLE IF NOT EXISTS seats (
-  seat_id    INTEGER PRIMARY KEY,
-  seat_url   TEXT,
-  seat_name  TEXT,
-  power_available  INTEGER   -- 0/1/NULL
-);
+# timeslots.status codes (stored as INTEGER, see status_from_classname)
+STATUS = {"AVAILABLE": 1, "UNAVAILABLE": 2}
+STATUS_AVAILABLE = STATUS["AVAILABLE"]
+STATUS_UNAVAILABLE = STATUS["UNAVAILABLE"]
 
+TIMESLOTS_TABLE = """
 CREATE TABLE IF NOT EXISTS timeslots (
-  id              INTEGER PRIMARY KEY AUTOINCREMENT,
   seat_id         INTEGER NOT NULL,
   start_iso       TEXT NOT NULL,
   end_iso         TEXT NOT NULL,
-  status          TEXT NOT NULL,
+  status          INTEGER NOT NULL,   -- STATUS code
   class_name      TEXT NOT NULL,
   checksum        TEXT,
   captured_at_iso TEXT NOT NULL,
   FOREIGN KEY(seat_id) REFERENCES seats(seat_id),
-  UNIQUE(seat_id, start_iso, end_iso)
+  PRIMARY KEY(seat_id, start_iso, end_iso)
+) WITHOUT ROWID;
+"""
+
+SCHEMA = """
+PRAGMA foreign_keys = ON;
+
+CREATE TABLE IF NOT EXISTS seats (
+  seat_id    INTEGER PRIMARY KEY,
+  seat_url   TEXT,
+  seat_name  TEXT,
+  power_available  INTEGER   -- 0/1/NULL
 );
 
-CREATE INDEX IF NOT EXISTS idx_timeslots_lookup
-ON timeslots(seat_id, start_iso, end_iso);
+""" + TIMESLOTS_TABLE + """
+-- (seat_id, start_iso, end_iso) is the primary key now
+DROP INDEX IF EXISTS idx_timeslots_lookup;
 
 CREATE INDEX IF NOT EXISTS idx_seats_name
 ON seats(seat_name);
+
+-- availability-window lookups (start/end range + status), covering seat_id
+CREATE INDEX IF NOT EXISTS idx_timeslots_window
+ON timeslots(start_iso, end_iso, status, seat_id);
+
+CREATE INDEX IF NOT EXISTS idx_seats_power
+ON seats(power_available);
+
+-- SQL_FULLY_AVAILABLE bounds start_iso on both sides; the AVAILABLE-only partial index
+-- was slower for it than the covering idx_timeslots_window on every window measured
+DROP INDEX IF EXISTS idx_timeslots_available;
+DROP INDEX IF EXISTS idx_timeslots_avail_range;
 """
 
-def init_db(path: str | None = None):
+# Bump SCHEMA_VERSION together with a new step in _migrate(); steps are additive and
+# check the actual layout, so a fresh DB (tables created by SCHEMA) just gets stamped.
+#   1: seats.power_available
+#   2: timeslots WITHOUT ROWID, integer status
+SCHEMA_VERSION = 2
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> list[str]:
+    return [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _add_seats_power_available(conn: sqlite3.Connection) -> None:
+    cols = _columns(conn, "seats")
+    if cols and "power_available" not in cols:
+        conn.execute("ALTER TABLE seats ADD COLUMN power_available INTEGER")
+
+
+def _rebuild_timeslots_without_rowid(conn: sqlite3.Connection) -> bool:
+    """
+    Old layout: rowid table (id AUTOINCREMENT) + UNIQUE btree, status as TEXT.
+    Copies the rows into the WITHOUT ROWID table with integer status codes.
+    """
+    if "id" not in _columns(conn, "timeslots"):
+        return False
+
+    conn.execute("ALTER TABLE timeslots RENAME TO timeslots_old")
+    for idx in ("idx_timeslots_lookup", "idx_timeslots_window",
+                "idx_timeslots_available", "idx_timeslots_avail_range"):
+        conn.execute(f"DROP INDEX IF EXISTS {idx}")
+    conn.execute(TIMESLOTS_TABLE)
+    conn.execute(f"""
+        INSERT INTO timeslots(seat_id, start_iso, end_iso, status, class_name, checksum, captured_at_iso)
+        SELECT seat_id, start_iso, end_iso,
+               CASE status WHEN 'AVAILABLE' THEN {STATUS_AVAILABLE} ELSE {STATUS_UNAVAILABLE} END,
+               class_name, checksum, captured_at_iso
+        FROM timeslots_old
+    """)
+    conn.execute("DROP TABLE timeslots_old")
+    return True
+
+
+def _migrate(conn: sqlite3.Connection) -> bool:
+    """
+    Brings an older DB up to SCHEMA_VERSION (PRAGMA user_version).
+    Returns True if there were existing tables (caller refreshes planner stats).
+    """
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return False
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # another process may have migrated while we waited for the lock
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            conn.rollback()
+            return False
+
+        existing = bool(_columns(conn, "seats") or _columns(conn, "timeslots"))
+        rebuilt = False
+        if version < 1:
+            _add_seats_power_available(conn)
+        if version < 2:
+            rebuilt = _rebuild_timeslots_without_rowid(conn)
+
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    if rebuilt:
+        # give the pages of the old rowid table + UNIQUE index back
+        conn.execute("VACUUM")
+    return existing
+
+
+def init_db(path: str | None = None, check_same_thread: bool = True,
+            isolation_level: str | None = ""):
+    """
+    isolation_level=None: no implicit BEGIN; the caller drives its own transactions
+    (bulk writers, see write_transaction). The default keeps sqlite3's implicit mode.
+    """
     db_path = Path(DB_PATH) if path is None else Path(path)
     db_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(str(db_path))
+    conn = sqlite3.connect(str(db_path), check_same_thread=check_same_thread,
+                           isolation_level=isolation_level)
+    # WAL: UI reads don't block the background worker's writes
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    # per-connection: bulk writers (fetch/init) sort and cache as much as the UI reads
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA cache_size=-65536")
+    migrated = _migrate(conn)
     conn.executescript(SCHEMA)
+    if migrated:
+        # planner stats for the rebuilt table / new indexes
+        conn.execute("ANALYZE")
     conn.commit()
     return conn
+
+
+@contextmanager
+def write_transaction(conn: sqlite3.Connection):
+    """
+    BEGIN IMMEDIATE ... COMMIT (ROLLBACK on error) on an isolation_level=None connection:
+    the write lock is taken up front, so the batch fails on the busy timeout instead of
+    mid-way, and it is one commit (one WAL sync) per block.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+# ----------------------------
+# Connection pool (read paths of the UI)
+# ----------------------------
+
+# Module-level on purpose: Streamlit only re-executes the app script on a rerun,
+# imported modules (and these pools) live for the whole process and are shared
+# by all sessions. The worker uses the same helpers without a Streamlit runtime.
+_POOLS: dict[str, queue.LifoQueue] = {}
+_POOL_LOCK = threading.Lock()
+
+
+def _pool_for(db_path: str) -> queue.LifoQueue:
+    with _POOL_LOCK:
+        pool = _POOLS.get(db_path)
+        if pool is None:
+            pool = _POOLS[db_path] = queue.LifoQueue()
+        return pool
+
+
+def _new_pooled_conn(db_path: str) -> sqlite3.Connection:
+    return init_db(db_path, check_same_thread=False)
+
+
+@contextmanager
+def get_conn(path: str | None = None):
+    """
+    Borrow a pooled connection (schema + PRAGMAs already applied) and give it back afterwards.
+    Do not close the yielded connection.
+    """
+    db_path = str(Path(DB_PATH) if path is None else Path(path))
+    pool = _pool_for(db_path)
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = _new_pooled_conn(db_path)
+
+    try:
+        yield conn
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        pool.put(conn)
+
+
+@atexit.register
+def _close_pools() -> None:
+    with _POOL_LOCK:
+        for pool in _POOLS.values():
+            while True:
+                try:
+                    pool.get_nowait().close()
+                except queue.Empty:
+                    break
@@ -1,12 +1,35 @@
 # discover_seats.py
 from __future__ import annotations
 import re
-import time
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
+from libcal_bot.fetch_availability.libcal_http import _pacer, mount_libcal_adapter
 
 SEAT_LIST_PAGE = "https://libcal.rug.nl/seats"
 
+# seat-list page: primary pattern + fallbacks, tried in order until one finds ids
+_SEAT_LINK_RE = re.compile(rb"/seat/(\d+)")
+_SEAT_ID_FALLBACK_RES = (
+    re.compile(rb'data-(?:seat|space)-id="(\d+)"'),
+    re.compile(rb'"seatId"\s*:\s*(\d+)'),
+    re.compile(rb'"id"\s*:\s*(\d+)'),
+)
+
+# seat-page parsing runs once per seat: compile the patterns once
+_TAG_RE = re.compile(r"<[^>]+>")
+_WS_RE = re.compile(r"\s+")
+_H1_RE = re.compile(r"<h1[^>]*>(.*?)</h1>", re.I | re.S)
+_TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.I | re.S)
+_TITLE_SPLIT_RE = re.compile(r"[-|•]")
+_NAME_ELEMENT_RES = tuple(re.compile(pat, re.I | re.S) for pat in (
+    r'class="[^"]*(?:space|seat)[^"]*(?:name|title)[^"]*"[^>]*>(.*?)</',
+    r'class="[^"]*item-title[^"]*"[^>]*>(.*?)</',
+    r'data-space-name="([^"]+)"',
+    r'data-seat-name="([^"]+)"',
+))
+
 
 def fetch_all_seat_ids(session: Optional[requests.Session] = None) -> list[int]:
     s = session or requests.Session()
@@ -18,25 +41,24 @@ def fetch_all_seat_ids(session: Optional[requests.Session] = None) -> list[int]:
 
     r = s.get(SEAT_LIST_PAGE, timeout=30)
     r.raise_for_status()
-    html = r.text
+    # raw bytes: the ids are ASCII, no need to decode the whole page
+    html = r.content
 
     # 1) klassieke seat links
-    ids = {int(m.group(1)) for m in re.finditer(r"/seat/(\d+)", html)}
+    ids = {int(x) for x in _SEAT_LINK_RE.findall(html)}
 
     # 2) fallback: soms staan IDs in data-attributes of JSON blobs
-    if not ids:
-        ids |= {int(x) for x in re.findall(r'data-(?:seat|space)-id="(\d+)"', html)}
-    if not ids:
-        ids |= {int(x) for x in re.findall(r'"seatId"\s*:\s*(\d+)', html)}
-    if not ids:
-        ids |= {int(x) for x in re.findall(r'"id"\s*:\s*(\d+)', html)}
+    for pat in _SEAT_ID_FALLBACK_RES:
+        if ids:
+            break
+        ids = {int(x) for x in pat.findall(html)}
 
     return sorted(ids)
 
 
 def _strip_tags(s: str) -> str:
-    s = re.sub(r"<[^>]+>", "", s)
-    s = re.sub(r"\s+", " ", s).strip()
+    s = _TAG_RE.sub("", s)
+    s = _WS_RE.sub(" ", s).strip()
     return s
 
 
@@ -53,7 +75,7 @@ def extract_seat_name_from_seat_page(html: str) -> Optional[str]:
     Tries multiple patterns because LibCal pages vary and may not put the seat name in <h1>.
     """
     # A) <h1>
-    m = re.search(r"<h1[^>]*>(.*?)</h1>", html, re.I | re.S)
+    m = _H1_RE.search(html)
     if m:
         name = _strip_tags(m.group(1))
         if name:
@@ -62,25 +84,20 @@ def extract_seat_name_from_seat_page(html: str) -> Optional[str]:
 
     # B) common named elements (heuristics)
     # Sometimes the name is in an element like: <span class="item-title">4.C.02</span>
-    for pat in [
-        r'class="[^"]*(?:space|seat)[^"]*(?:name|title)[^"]*"[^>]*>(.*?)</',
-        r'class="[^"]*item-title[^"]*"[^>]*>(.*?)</',
-        r'data-space-name="([^"]+)"',
-        r'data-seat-name="([^"]+)"',
-    ]:
-        m = re.search(pat, html, re.I | re.S)
+    for pat in _NAME_ELEMENT_RES:
+        m = pat.search(html)
         if m:
             candidate = _strip_tags(m.group(1))
             if candidate:
                 return candidate
 
     # C) <title> fallback
-    m = re.search(r"<title[^>]*>(.*?)</title>", html, re.I | re.S)
+    m = _TITLE_RE.search(html)
     if m:
         title = _strip_tags(m.group(1))
         if title:
             # try to extract middle part: "LibCal - 4.C.02 - ..."
-            parts = [p.strip() for p in re.split(r"[-|•]", title) if p.strip()]
+            parts = [p.strip() for p in _TITLE_SPLIT_RE.split(title) if p.strip()]
             if len(parts) >= 2:
                 return parts[1]
             return title
@@ -99,44 +116,62 @@ def fetch_seat_name(session: requests.Session, seat_id: int) -> Optional[str]:
     return fetch_seat_name_from_html(r.text)
 
 
+def _make_discovery_session(pool_size: int = 16) -> requests.Session:
+    s = requests.Session()
+    s.headers.update({
+        "User-Agent": "Mozilla/5.0 (compatible; seat-discovery/1.0)",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Referer": "https://libcal.rug.nl/seats",
+    })
+    # keep-alive pool big enough for all workers; retries/backoff replace the sleep
+    return mount_libcal_adapter(s, pool_size)
+
+
 def fetch_all_seats_with_names(
     polite_sleep: float = 0.05,
     limit: Optional[int] = None,
     debug_first_failure_to_file: bool = True,
+    max_workers: int = 8,
 ) -> list[tuple[int, str, Optional[str]]]:
     """
-    Returns list of (seat_id, seat_url, seat_name_or_none)
+    Returns list of (seat_id, seat_url, seat_name_or_none), in seat_id order.
+    Seat pages are fetched concurrently over one pooled session; polite_sleep is the
+    minimum gap between two seat-page requests across all workers.
     """
-    s = requests.Session()
-    s.headers.update({
-        "User-Agent": "Mozilla/5.0 (compatible; seat-discovery/1.0)",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Referer": "https://libcal.rug.nl/seats",
-    })
+    s = _make_discovery_session(pool_size=max(16, max_workers))
+    pace = _pacer(polite_sleep)
 
     seat_ids = fetch_all_seat_ids(session=s)
     if limit is not None:
         seat_ids = seat_ids[:limit]
 
-    out: list[tuple[int, str, Optional[str]]] = []
+    first_fail_lock = threading.Lock()
     first_fail_saved = False
 
-    for i, seat_id in enumerate(seat_ids, 1):
+    def _one(seat_id: int) -> tuple[int, str, Optional[str]]:
+        nonlocal first_fail_saved
         seat_url = f"https://libcal.rug.nl/seat/{seat_id}"
         try:
+            pace()
             seat_name = fetch_seat_name(s, seat_id)
-            if seat_name is None and debug_first_failure_to_file and not first_fail_saved:
-                # save HTML once to inspect where the name actually is
-                r = s.get(seat_url, timeout=30)
-                with open("debug_one_seat.html", "w", encoding="utf-8") as f:
-                    f.write(r.text)
-                first_fail_saved = True
-            out.append((seat_id, seat_url, seat_name))
-        except Exception as e:
-            out.append((seat_id, seat_url, None))
-        time.sleep(polite_sleep)
-
-    return out
+            if seat_name is None and debug_first_failure_to_file:
+                with first_fail_lock:
+                    save = not first_fail_saved
+                    first_fail_saved = True
+                if save:
+                    # save HTML once to inspect where the name actually is
+                    r = s.get(seat_url, timeout=30)
+                    with open("debug_one_seat.html", "w", encoding="utf-8") as f:
+                        f.write(r.text)
+            return (seat_id, seat_url, seat_name)
+        except Exception:
+            return (seat_id, seat_url, None)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as ex:
+            return list(ex.map(_one, seat_ids))
+    finally:
+        s.close()
 
 def find_if_power_available(html: str) -> bool:
     """
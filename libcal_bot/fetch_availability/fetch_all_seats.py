@@ -1,16 +1,19 @@
 # fetch_all_seats.py
 from __future__ import annotations
 import time
+import threading
 import requests
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone, date
 
-from libcal_bot.fetch_availability.db import init_db
-from libcal_bot.fetch_availability.discover_seats import fetch_all_seat_ids, fetch_seat_name, find_if_power_available
-from libcal_bot.fetch_availability.fetch_one_seat import GRID_URL, status_from_classname, upsert_seat
+from libcal_bot.fetch_availability.db import init_db, write_transaction
+from libcal_bot.fetch_availability.discover_seats import fetch_all_seat_ids, fetch_seat_name_from_html, find_if_power_available
+from libcal_bot.fetch_availability.libcal_http import _pacer, mount_libcal_adapter
+from libcal_bot.fetch_availability.fetch_one_seat import GRID_URL, UPSERT_SEAT_SQL, UPSERT_TIMESLOT_SQL, _seat_row, _timeslot_rows
 
 
-def _make_libcal_session() -> requests.Session:
+def _make_libcal_session(pool_size: int = 10) -> requests.Session:
     s = requests.Session()
     s.headers.update({
         "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
@@ -24,11 +27,15 @@ def _make_libcal_session() -> requests.Session:
         "X-Requested-With": "XMLHttpRequest",
         "Connection": "keep-alive",
     })
-    return s
+    return mount_libcal_adapter(s, pool_size)
 
 
 def fetch_slots_with_retry(session: requests.Session, seat_id: int, start_date: str, end_date: str,
-                           lid=1443, gid=3634, eid=10948, zone=0, max_retries: int = 5) -> list[dict]:
+                           lid=1443, gid=3634, eid=10948, zone=0) -> list[dict]:
+    """
+    One grid POST; the retries/backoff come from the session's adapter
+    (mount_libcal_adapter, already done by _make_libcal_session).
+    """
     data = {
         "lid": str(lid),
         "gid": str(gid),
@@ -42,55 +49,97 @@ def fetch_slots_with_retry(session: requests.Session, seat_id: int, start_date:
         "pageSize": "200",
     }
 
-    last_resp = None
-    for attempt in range(max_retries):
-        r = session.post(GRID_URL, data=data, timeout=30)
-        last_resp = r
-
-        if r.status_code == 403:
-            # Helpful debug (once)
-            raise requests.HTTPError(
-                f"403 Forbidden from grid. "
-                f"Check headers/cookies. Response snippet: {r.text[:200]!r}",
-                response=r,
-            )
-
-        if r.status_code in (429, 500, 502, 503, 504):
-            time.sleep(min(60, 1.5 ** attempt))
-            continue
+    r = session.post(GRID_URL, data=data, timeout=30)
 
-        r.raise_for_status()
-        return r.json().get("slots", [])
+    if r.status_code == 403:
+        # Helpful debug (once)
+        raise requests.HTTPError(
+            f"403 Forbidden from grid. "
+            f"Check headers/cookies. Response snippet: {r.text[:200]!r}",
+            response=r,
+        )
 
-    if last_resp is not None:
-        last_resp.raise_for_status()
-    return []
+    r.raise_for_status()
+    return r.json().get("slots", [])
 
 
 def upsert_timeslots(conn: sqlite3.Connection, seat_id: int, slots: list[dict]):
     captured_at = datetime.now(timezone.utc).isoformat()
-    for it in slots:
-        start = it.get("start")
-        end = it.get("end")
-        if not start or not end:
-            continue
-        class_name = it.get("className", "")
-        checksum = it.get("checksum")
-        status = status_from_classname(class_name)
-
-        conn.execute(
-            """
-            INSERT INTO timeslots(seat_id, start_iso, end_iso, status, class_name, checksum, captured_at_iso)
-            VALUES(?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(seat_id, start_iso, end_iso)
-            DO UPDATE SET
-              status=excluded.status,
-              class_name=excluded.class_name,
-              checksum=excluded.checksum,
-              captured_at_iso=excluded.captured_at_iso
-            """,
-            (seat_id, start, end, status, class_name, checksum, captured_at),
-        )
+    conn.executemany(UPSERT_TIMESLOT_SQL, _timeslot_rows(seat_id, slots, captured_at))
+
+
+def _per_thread_sessions(headers: dict, on_response=None):
+    """
+    Returns (get_session, sessions): get_session() gives the calling thread its own
+    Session (created on first use); close everything in `sessions` when done.
+    on_response: optional requests response hook installed on every session.
+    """
+    local = threading.local()
+    sessions: list[requests.Session] = []
+
+    def get_session() -> requests.Session:
+        s = getattr(local, "session", None)
+        if s is None:
+            s = local.session = mount_libcal_adapter(requests.Session())
+            s.headers.update(headers)
+            if on_response is not None:
+                s.hooks["response"].append(on_response)
+            sessions.append(s)
+        return s
+
+    return get_session, sessions
+
+
+# fetch_availability: ceiling on the adaptive rate, as a multiple of the old serial rate
+_MAX_SPEEDUP = 4.0
+
+# throttling signals: 429/503, whether they were the final answer or retried by the adapter
+_THROTTLE_STATUSES = (429, 503)
+
+
+def _was_throttled(r: requests.Response) -> bool:
+    if r.status_code in _THROTTLE_STATUSES:
+        return True
+    retries = getattr(r.raw, "retries", None)
+    return any(h.status in _THROTTLE_STATUSES for h in getattr(retries, "history", ()))
+
+
+def _adaptive_pacer(
+    start_interval: float,
+    min_interval: float | None = None,
+    max_interval: float = 5.0,
+    step: float = 0.002,
+):
+    """
+    Like _pacer, but the gap adapts (AIMD): a throttled response doubles it (up to
+    max_interval), every clean one shrinks it by `step`, never below min_interval
+    (default: start_interval, so the rate is capped at the starting rate).
+    Returns (wait, on_response); on_response is a requests response hook.
+    """
+    if min_interval is None:
+        min_interval = start_interval
+    lock = threading.Lock()
+    interval = start_interval
+    next_at = 0.0
+
+    def wait() -> None:
+        nonlocal next_at
+        with lock:
+            now = time.monotonic()
+            start_at = max(now, next_at)
+            next_at = start_at + interval
+        if start_at > now:
+            time.sleep(start_at - now)
+
+    def on_response(r: requests.Response, *args, **kwargs) -> None:
+        nonlocal interval
+        with lock:
+            if _was_throttled(r):
+                interval = min(max_interval, max(interval, step) * 2)
+            else:
+                interval = max(min_interval, interval - step)
+
+    return wait, on_response
 
 
 def init_static_data(
@@ -100,14 +149,17 @@ def init_static_data(
     progress_cb=None,
     limit: int | None = None,
     debug: bool = False,
+    max_workers: int = 8,
 ) -> tuple[int, int]:
     """
     Builds/updates static seat data in `seats` table:
       - seat_id
       - seat_url
-      - seat_name (via fetch_seat_name)
+      - seat_name (via fetch_seat_name_from_html)
       - power_available (via HTML contains 'Power Available')
 
+    Seat pages are fetched once each, concurrently (max_workers threads, one Session
+    per thread); DB writes stay on the calling thread.
     Returns (processed_count, failed_count)
     progress_cb(i, total, seat_id, failed_count)
     """
@@ -118,72 +170,81 @@ def init_static_data(
     total = len(seat_ids)
     failed = 0
 
-    conn = init_db(str(db_path) if db_path is not None else None)
+    # no implicit BEGIN: every batch write below is an explicit write_transaction
+    conn = init_db(str(db_path) if db_path is not None else None, isolation_level=None)
 
-    session = requests.Session()
-    session.headers.update({
+    get_session, sessions = _per_thread_sessions({
         "User-Agent": "Mozilla/5.0 (compatible; seat-static-init/1.0)",
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
         "Referer": "https://libcal.rug.nl/seats",
     })
 
-    try:
-        conn.execute("BEGIN")
-
-        for i, seat_id in enumerate(seat_ids, 1):
-            seat_url = f"https://libcal.rug.nl/seat/{seat_id}"
-
-            seat_name = None
-            power_available = None
+    # polite_sleep is the minimum gap between two requests across all workers
+    pace = _pacer(polite_sleep)
 
-            try:
-                # 1) Seat name (your preferred single source of truth)
-                seat_name = fetch_seat_name(session, seat_id)
+    def _fetch(seat_id: int) -> tuple[str | None, bool]:
+        pace()
+        r = get_session().get(f"https://libcal.rug.nl/seat/{seat_id}", timeout=30)
+        r.raise_for_status()
+        html = r.text
+        # name and power flag come from the same page: one GET per seat
+        return fetch_seat_name_from_html(html), find_if_power_available(html)
 
-                # 2) Power available: fetch HTML once and check for the phrase
-                r = session.get(seat_url, timeout=30)
-                r.raise_for_status()
-                html = r.text
-                power_available = find_if_power_available(html)
+    try:
+        # fetched outside any transaction; each batch write is its own short
+        # BEGIN IMMEDIATE ... COMMIT, so the write lock is never held while waiting on the network
+        seat_rows: list[tuple] = []
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(_fetch, seat_id): seat_id for seat_id in seat_ids}
+            for i, fut in enumerate(as_completed(futures), 1):
+                seat_id = futures[fut]
+                seat_url = f"https://libcal.rug.nl/seat/{seat_id}"
+
+                seat_name = None
+                power_available = None
+
+                try:
+                    seat_name, power_available = fut.result()
+
+                    if debug and i <= 3:
+                        print("PARSED:", seat_id, repr(seat_name), power_available)
+                        row = conn.execute(
+                            "SELECT seat_name, power_available FROM seats WHERE seat_id=?",
+                            (seat_id,)
+                        ).fetchone()
+                        print("READBACK (before upsert):", seat_id, row)
+
+                except Exception as e:
+                    failed += 1
+                    if debug and i <= 3:
+                        print(f"FAILED seat_id={seat_id}: {e}")
+
+                # buffered: one executemany per batch instead of a statement per seat
+                seat_rows.append(_seat_row(seat_id, seat_url, seat_name, power_available))
 
                 if debug and i <= 3:
-                    print("PARSED:", seat_id, repr(seat_name), power_available)
-                    row = conn.execute(
+                    with write_transaction(conn):
+                        conn.executemany(UPSERT_SEAT_SQL, seat_rows)
+                    seat_rows.clear()
+                    row2 = conn.execute(
                         "SELECT seat_name, power_available FROM seats WHERE seat_id=?",
                         (seat_id,)
                     ).fetchone()
-                    print("READBACK (before upsert):", seat_id, row)
+                    print("READBACK (after upsert):", seat_id, row2)
 
-            except Exception as e:
-                failed += 1
-                if debug and i <= 3:
-                    print(f"FAILED seat_id={seat_id}: {e}")
-
-            upsert_seat(
-                conn,
-                seat_id=seat_id,
-                seat_url=seat_url,
-                seat_name=seat_name,
-                power_available=power_available,
-            )
-
-            if debug and i <= 3:
-                row2 = conn.execute(
-                    "SELECT seat_name, power_available FROM seats WHERE seat_id=?",
-                    (seat_id,)
-                ).fetchone()
-                print("READBACK (after upsert):", seat_id, row2)
-
-            if i % batch_size == 0:
-                conn.commit()
-                conn.execute("BEGIN")
+                if i % batch_size == 0:
+                    with write_transaction(conn):
+                        conn.executemany(UPSERT_SEAT_SQL, seat_rows)
+                    seat_rows.clear()
 
-            if progress_cb is not None:
-                progress_cb(i, total, seat_id, failed)
+                if progress_cb is not None:
+                    progress_cb(i, total, seat_id, failed)
 
-            time.sleep(polite_sleep)
-
-        conn.commit()
+        with write_transaction(conn):
+            conn.executemany(UPSERT_SEAT_SQL, seat_rows)
+        # refresh planner statistics once after the bulk load
+        conn.execute("ANALYZE")
 
         if progress_cb is not None and total:
             progress_cb(total, total, seat_ids[-1], failed)
@@ -192,7 +253,8 @@ def init_static_data(
 
     finally:
         conn.close()
-        session.close()
+        for s in sessions:
+            s.close()
 
 
 def _seat_ids_from_db(conn: sqlite3.Connection) -> list[int]:
@@ -203,57 +265,79 @@ def fetch_availability(
     start_date: str,
     end_date: str,
     db_path: str | None = None,
-    batch_size: int = 25,
+    flush_rows: int = 5000,
     polite_sleep: float = 0.15,
     progress_cb=None,
+    max_workers: int = 8,
 ) -> tuple[int, int]:
     """
     Fetches dynamic availability (timeslots) for seat_ids stored in DB.
+    HTTP requests run concurrently (max_workers threads, one Session per thread);
+    DB writes stay on the calling thread: rows are buffered and written with
+    executemany every `flush_rows` rows, one short BEGIN IMMEDIATE ... COMMIT per
+    flush (the write lock is never held while waiting on the network).
     Returns (processed_count, failed_count)
     progress_cb(i, total, seat_id, failed_count)
     """
-    conn = init_db(db_path)
+    conn = init_db(db_path, isolation_level=None)
     seat_ids = _seat_ids_from_db(conn)
 
     total = len(seat_ids)
     failed = 0
 
-    s = requests.Session()
-    s.headers.update({
+    headers = {
         "User-Agent": "Mozilla/5.0 (compatible; seat-availability-fetch/1.0)",
         "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
         "Accept": "application/json, text/plain, */*",
         "Origin": "https://libcal.rug.nl",
         "Referer": "https://libcal.rug.nl/seats",
-    })
-
-    try:
-        conn.execute("BEGIN")
-        for i, seat_id in enumerate(seat_ids, 1):
-            try:
-                slots = fetch_slots_with_retry(s, seat_id, start_date, end_date)
-                upsert_timeslots(conn, seat_id, slots)
-            except Exception as e:
-                failed += 1
-                print(f"[{i}/{total}] seat {seat_id} FAILED: {e}")
-
-            if i % batch_size == 0:
-                conn.commit()
-                conn.execute("BEGIN")
+    }
+    # shared adaptive gap instead of a fixed sleep: starts at the old serial rate (one
+    # request per polite_sleep across all workers), speeds up while LibCal answers cleanly
+    # to at most _MAX_SPEEDUP times that rate, doubles the gap on every 429/503
+    pace, on_response = _adaptive_pacer(polite_sleep, min_interval=polite_sleep / _MAX_SPEEDUP)
+    get_session, sessions = _per_thread_sessions(headers, on_response=on_response)
 
-            if progress_cb is not None:
-                progress_cb(i, total, seat_id, failed)
+    def _fetch(seat_id: int) -> list[dict]:
+        pace()
+        return fetch_slots_with_retry(get_session(), seat_id, start_date, end_date)
 
-            time.sleep(polite_sleep)
+    batch: list[tuple] = []
 
-        conn.commit()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(_fetch, seat_id): seat_id for seat_id in seat_ids}
+            for i, fut in enumerate(as_completed(futures), 1):
+                seat_id = futures[fut]
+                try:
+                    captured_at = datetime.now(timezone.utc).isoformat()
+                    batch.extend(_timeslot_rows(seat_id, fut.result(), captured_at))
+                except Exception as e:
+                    failed += 1
+                    print(f"[{i}/{total}] seat {seat_id} FAILED: {e}")
+
+                if len(batch) >= flush_rows:
+                    with write_transaction(conn):
+                        conn.executemany(UPSERT_TIMESLOT_SQL, batch)
+                    batch.clear()
+
+                if progress_cb is not None:
+                    progress_cb(i, total, seat_id, failed)
+
+        if batch:
+            with write_transaction(conn):
+                conn.executemany(UPSERT_TIMESLOT_SQL, batch)
+        # cheap, but only analyzes what this connection's own queries flagged; it does
+        # not refresh timeslots after the bulk upsert (nightly_job runs ANALYZE timeslots)
+        conn.execute("PRAGMA optimize")
         if progress_cb is not None and total:
             progress_cb(total, total, seat_ids[-1], failed)
 
         return total, failed
     finally:
         conn.close()
-        s.close()
+        for s in sessions:
+            s.close()
 
 def clean_up(
     db_path: str | None = None,
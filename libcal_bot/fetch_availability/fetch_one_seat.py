@@ -2,13 +2,26 @@
 from __future__ import annotations
 import sqlite3
 from datetime import datetime, timezone
+from functools import lru_cache
 import requests
-from libcal_bot.fetch_availability.db import init_db
+from libcal_bot.fetch_availability.db import STATUS, init_db
 from libcal_bot.fetch_availability.discover_seats import fetch_seat_name
+from libcal_bot.fetch_availability.libcal_http import mount_libcal_adapter
 
 
 GRID_URL = "https://libcal.rug.nl/spaces/availability/grid"
 
+# one keep-alive session for all fetch_slots calls (single host), same retries as the bulk fetch
+_SESSION = mount_libcal_adapter(requests.Session())
+_SESSION.headers.update({
+    "User-Agent": "Mozilla/5.0 (compatible; seat-availability-fetch/1.0)",
+    "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
+    "Accept": "application/json, text/plain, */*",
+    "Origin": "https://libcal.rug.nl",
+})
+
+# a handful of distinct class names ("s-lc-eq-avail", "s-lc-eq-checkout", ...), once per slot
+@lru_cache(maxsize=64)
 def status_from_classname(class_name: str) -> str:
     cn = (class_name or "").lower()
     if "checkout" in cn:
@@ -37,66 +50,73 @@ def fetch_slots(seat_id: int, start_date: str, end_date: str,
         "pageSize": str(page_size),
     }
 
-    s = requests.Session()
-    s.headers.update({
-        "User-Agent": "Mozilla/5.0 (compatible; seat-availability-fetch/1.0)",
-        "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
-        "Accept": "application/json, text/plain, */*",
-        "Origin": "https://libcal.rug.nl",
-        "Referer": f"https://libcal.rug.nl/seat/{seat_id}",
-    })
-
-    r = s.post(GRID_URL, data=data, timeout=30)
+    r = _SESSION.post(
+        GRID_URL,
+        data=data,
+        headers={"Referer": f"https://libcal.rug.nl/seat/{seat_id}"},
+        timeout=30,
+    )
     r.raise_for_status()
     payload = r.json()
     return payload.get("slots", [])
 
-def upsert_seat(conn, seat_id, seat_url, seat_name=None, power_available=None):
-    conn.execute(
-        """
-        INSERT INTO seats(seat_id, seat_url, seat_name, power_available)
-        VALUES(?, ?, ?, ?)
-        ON CONFLICT(seat_id) DO UPDATE SET
-          seat_url = excluded.seat_url,
-          seat_name = COALESCE(excluded.seat_name, seats.seat_name),
-          power_available = COALESCE(excluded.power_available, seats.power_available)
-        """,
-        (
-            seat_id,
-            seat_url,
-            seat_name,
-            None if power_available is None else int(bool(power_available)),
-        ),
+UPSERT_SEAT_SQL = """
+INSERT INTO seats(seat_id, seat_url, seat_name, power_available)
+VALUES(?, ?, ?, ?)
+ON CONFLICT(seat_id) DO UPDATE SET
+  seat_url = excluded.seat_url,
+  seat_name = COALESCE(excluded.seat_name, seats.seat_name),
+  power_available = COALESCE(excluded.power_available, seats.power_available)
+"""
+
+
+def _seat_row(seat_id, seat_url, seat_name=None, power_available=None) -> tuple:
+    return (
+        seat_id,
+        seat_url,
+        seat_name,
+        None if power_available is None else int(bool(power_available)),
     )
 
 
-def insert_snapshot(conn: sqlite3.Connection, seat_id: int, slots: list[dict]):
-    captured_at = datetime.now(timezone.utc).isoformat()
-
+def upsert_seat(conn, seat_id, seat_url, seat_name=None, power_available=None):
+    conn.execute(UPSERT_SEAT_SQL, _seat_row(seat_id, seat_url, seat_name, power_available))
+
+
+UPSERT_TIMESLOT_SQL = """
+INSERT INTO timeslots(seat_id, start_iso, end_iso, status, class_name, checksum, captured_at_iso)
+VALUES(?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(seat_id, start_iso, end_iso)
+DO UPDATE SET
+  status=excluded.status,
+  class_name=excluded.class_name,
+  checksum=excluded.checksum,
+  captured_at_iso=excluded.captured_at_iso
+-- unchanged slot: skip the write (status follows class_name)
+WHERE timeslots.class_name IS NOT excluded.class_name
+   OR timeslots.checksum IS NOT excluded.checksum
+"""
+
+
+def _timeslot_rows(seat_id: int, slots: list[dict], captured_at: str) -> list[tuple]:
+    # hot loop (every slot of every seat): bind the lookups locally
+    get = dict.get
+    status_of = status_from_classname
+    rows = []
+    append = rows.append
     for it in slots:
-        start = it.get("start")
-        end = it.get("end")
-        class_name = it.get("className", "")
-        checksum = it.get("checksum")
-        status = status_from_classname(class_name)
-
+        start = get(it, "start")
+        end = get(it, "end")
         if not start or not end:
             continue
+        class_name = get(it, "className", "")
+        append((seat_id, start, end, STATUS[status_of(class_name)], class_name, get(it, "checksum"), captured_at))
+    return rows
 
-        conn.execute(
-            """
-            INSERT INTO timeslots(seat_id, start_iso, end_iso, status, class_name, checksum, captured_at_iso)
-            VALUES(?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(seat_id, start_iso, end_iso)
-            DO UPDATE SET
-              status=excluded.status,
-              class_name=excluded.class_name,
-              checksum=excluded.checksum,
-              captured_at_iso=excluded.captured_at_iso
-            """,
-            (seat_id, start, end, status, class_name, checksum, captured_at),
-        )
 
+def insert_snapshot(conn: sqlite3.Connection, seat_id: int, slots: list[dict]):
+    captured_at = datetime.now(timezone.utc).isoformat()
+    conn.executemany(UPSERT_TIMESLOT_SQL, _timeslot_rows(seat_id, slots, captured_at))
     conn.commit()
 
 def main():
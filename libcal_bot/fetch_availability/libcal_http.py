@@ -0,0 +1,52 @@
+# libcal_bot/fetch_availability/libcal_http.py
+from __future__ import annotations
+
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# Shared by every LibCal session (grid POSTs, seat pages, discovery); lives here so
+# discover_seats/fetch_one_seat can use it without importing fetch_all_seats.
+# 429/5xx retries live in the connection layer: jittered exponential backoff, honours
+# Retry-After and keeps the pooled connection. The grid POST is a read, so retrying is safe.
+LIBCAL_RETRY = Retry(
+    total=5,
+    backoff_factor=0.5,
+    backoff_jitter=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset({"GET", "POST"}),
+    raise_on_status=False,  # hand back the last response; callers raise_for_status()
+)
+
+
+def mount_libcal_adapter(s: requests.Session, pool_size: int = 10) -> requests.Session:
+    s.mount("https://", HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=LIBCAL_RETRY,
+    ))
+    return s
+
+
+def _pacer(min_interval: float):
+    """
+    Returns wait(): blocks so that calls from all threads start at least
+    min_interval seconds apart (shared pacing instead of a sleep per worker).
+    """
+    lock = threading.Lock()
+    next_at = 0.0
+
+    def wait() -> None:
+        nonlocal next_at
+        with lock:
+            now = time.monotonic()
+            start_at = max(now, next_at)
+            next_at = start_at + min_interval
+        if start_at > now:
+            time.sleep(start_at - now)
+
+    return wait
@@ -1,44 +1,43 @@
 # find_available_seats.py
-import sqlite3
 from typing import List, Tuple
 from libcal_bot.paths import DB_PATH
+from libcal_bot.fetch_availability.db import STATUS_AVAILABLE, get_conn
 
 
-SQL_FULLY_AVAILABLE = """
-WITH interval_slots AS (
-  SELECT start_iso, end_iso
+# number of distinct slots in [x, y]; bound as :n below
+SQL_INTERVAL_SLOTS = """
+SELECT COUNT(*) FROM (
+  SELECT 1
   FROM timeslots
   WHERE start_iso >= :x
+    AND start_iso <  :y
     AND end_iso   <= :y
   GROUP BY start_iso, end_iso
-),
-needed AS (
-  SELECT COUNT(*) AS n FROM interval_slots
-),
-per_seat AS (
-  SELECT seat_id, COUNT(*) AS k
-  FROM timeslots
-  WHERE status = 'AVAILABLE'
-    AND start_iso >= :x
-    AND end_iso   <= :y
-  GROUP BY seat_id
-)
+);
+"""
+
+# one grouped pass over the AVAILABLE slots (same shape as the app's query)
+SQL_FULLY_AVAILABLE = f"""
 SELECT s.seat_id, s.seat_url
-FROM per_seat p
-JOIN needed n
-JOIN seats s ON s.seat_id = p.seat_id
-WHERE p.k = n.n
-  AND n.n > 0
+FROM timeslots t
+JOIN seats s ON s.seat_id = t.seat_id
+WHERE t.status = {STATUS_AVAILABLE}
+  AND t.start_iso >= :x
+  AND t.start_iso <  :y
+  AND t.end_iso   <= :y
+GROUP BY t.seat_id
+HAVING COUNT(*) = :n
 ORDER BY s.seat_id;
 """
 
 def seats_fully_available(db_path: str, x: str, y: str) -> List[Tuple[int, str]]:
-    conn = sqlite3.connect(str(DB_PATH))
-    try:
-        rows = conn.execute(SQL_FULLY_AVAILABLE, {"x": x, "y": y}).fetchall()
-        return [(int(seat_id), str(seat_url)) for seat_id, seat_url in rows]
-    finally:
-        conn.close()
+    # pooled init_db connection: same PRAGMAs (temp_store/cache/mmap) as the other readers
+    with get_conn(str(DB_PATH)) as conn:
+        n = conn.execute(SQL_INTERVAL_SLOTS, {"x": x, "y": y}).fetchone()[0]
+        if n == 0:
+            return []
+        rows = conn.execute(SQL_FULLY_AVAILABLE, {"x": x, "y": y, "n": n}).fetchall()
+    return [(int(seat_id), str(seat_url)) for seat_id, seat_url in rows]
 
 if __name__ == "__main__":
     # voorbeeld: morgen 10:00–13:30
@@ -1,7 +1,6 @@
 # libcal_bot/find_seats/snipe_seats.py
 from __future__ import annotations
 
-import sqlite3
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional, Sequence, List, Tuple
@@ -9,7 +8,8 @@ from typing import Optional, Sequence, List, Tuple
 import requests
 
 from libcal_bot.paths import DB_PATH
-from libcal_bot.fetch_availability.fetch_all_seats import fetch_slots_with_retry
+from libcal_bot.fetch_availability.db import STATUS_AVAILABLE, STATUS_UNAVAILABLE, get_conn
+from libcal_bot.fetch_availability.fetch_all_seats import _make_libcal_session, fetch_slots_with_retry
 from libcal_bot.fetch_availability.fetch_one_seat import status_from_classname
 
 
@@ -17,6 +17,20 @@ from libcal_bot.fetch_availability.fetch_one_seat import status_from_classname
 # Helpers
 # -------------------------
 
+def _slot_index(slots: list[dict]) -> dict[tuple[str, str], str]:
+    """
+    Build once per slots list: (start, end) -> className.
+    """
+    return {(it.get("start"), it.get("end")): it.get("className", "") for it in slots}
+
+
+def _slot_is_available(slot_index: dict[tuple[str, str], str], start_iso: str, end_iso: str) -> bool:
+    class_name = slot_index.get((start_iso, end_iso))
+    if class_name is None:
+        return False
+    return status_from_classname(class_name) == "AVAILABLE"
+
+
 def _fmt(dt: datetime) -> str:
     """Format datetime exactly like your DB timeslots format."""
     return dt.isoformat(sep=" ")
@@ -85,8 +99,61 @@ def _area_filter_sql(areas: Sequence[str]) -> tuple[str, list]:
 # 1) Find snipable seats (DB)
 # -------------------------
 
-from datetime import datetime, timedelta
-import sqlite3
+def _snipable_query(
+    start_time: datetime,
+    hunting_zone: tuple[Sequence[str], Sequence[str]],
+    select: str,
+) -> tuple[str, list]:
+    """
+    Builds the snipable-seats query (see snipable_seats) with a custom SELECT list,
+    e.g. "DISTINCT s.seat_id" or "COUNT(DISTINCT s.seat_id)".
+    """
+    power_selection, areas = hunting_zone
+
+    prev_start = start_time - timedelta(minutes=30)
+    prev_start_iso = _fmt(prev_start)
+
+    prevprev_start = start_time - timedelta(minutes=60)
+    prevprev_start_iso = _fmt(prevprev_start)
+
+    power_sql, power_params = _power_filter_sql(power_selection)
+    area_sql, area_params = _area_filter_sql(areas)
+
+    # Special case: start_time == 09:30 (local time)
+    is_0930 = (start_time.hour == 9 and start_time.minute == 30)
+
+    if is_0930:
+        # Only check: previous slot is UNAVAILABLE
+        sql = f"""
+        SELECT {select}
+        FROM timeslots t_prev
+        JOIN seats s ON s.seat_id = t_prev.seat_id
+        WHERE t_prev.start_iso = ?
+          AND t_prev.status = {STATUS_UNAVAILABLE}
+          {power_sql}
+          {area_sql}
+        """
+        params = [prev_start_iso] + power_params + area_params
+    else:
+        # Check: prev is UNAVAILABLE AND prevprev is AVAILABLE
+        sql = f"""
+        SELECT {select}
+        FROM timeslots t_prev
+        JOIN timeslots t_prevprev
+          ON t_prevprev.seat_id = t_prev.seat_id
+        JOIN seats s
+          ON s.seat_id = t_prev.seat_id
+        WHERE t_prev.start_iso = ?
+          AND t_prev.status = {STATUS_UNAVAILABLE}
+          AND t_prevprev.start_iso = ?
+          AND t_prevprev.status = {STATUS_AVAILABLE}
+          {power_sql}
+          {area_sql}
+        """
+        params = [prev_start_iso, prevprev_start_iso] + power_params + area_params
+
+    return sql, params
+
 
 def snipable_seats(
     start_time: datetime,
@@ -101,58 +168,28 @@ def snipable_seats(
                  (seat is always snipable in that case).
     """
     db_path = str(DB_PATH) if db_path is None else str(db_path)
-    power_selection, areas = hunting_zone
-
-    prev_start = start_time - timedelta(minutes=30)
-    prev_start_iso = _fmt(prev_start)
+    sql, params = _snipable_query(start_time, hunting_zone, select="DISTINCT s.seat_id")
 
-    prevprev_start = start_time - timedelta(minutes=60)
-    prevprev_start_iso = _fmt(prevprev_start)
+    # pooled connection: no connect per call, and its statement cache keeps one
+    # prepared statement per filter shape (the SQL text only varies with the filters)
+    with get_conn(db_path) as conn:
+        rows = conn.execute(sql + " ORDER BY s.seat_id;", params).fetchall()
+    return [int(r[0]) for r in rows]
 
-    power_sql, power_params = _power_filter_sql(power_selection)
-    area_sql, area_params = _area_filter_sql(areas)
 
-    # Special case: start_time == 09:30 (local time)
-    is_0930 = (start_time.hour == 9 and start_time.minute == 30)
+def count_snipable_seats(
+    start_time: datetime,
+    hunting_zone: tuple[Sequence[str], Sequence[str]],  # (power_selection, areas)
+    db_path: str | None = None,
+) -> int:
+    """
+    Same rules as snipable_seats, but only returns how many there are (COUNT in SQL).
+    """
+    db_path = str(DB_PATH) if db_path is None else str(db_path)
+    sql, params = _snipable_query(start_time, hunting_zone, select="COUNT(DISTINCT s.seat_id)")
 
-    conn = sqlite3.connect(db_path)
-    try:
-        if is_0930:
-            # Only check: previous slot is UNAVAILABLE
-            sql = f"""
-            SELECT DISTINCT s.seat_id
-            FROM timeslots t_prev
-            JOIN seats s ON s.seat_id = t_prev.seat_id
-            WHERE t_prev.start_iso = ?
-              AND t_prev.status = 'UNAVAILABLE'
-              {power_sql}
-              {area_sql}
-            ORDER BY s.seat_id;
-            """
-            params = [prev_start_iso] + power_params + area_params
-        else:
-            # Check: prev is UNAVAILABLE AND prevprev is AVAILABLE
-            sql = f"""
-            SELECT DISTINCT s.seat_id
-            FROM timeslots t_prev
-            JOIN timeslots t_prevprev
-              ON t_prevprev.seat_id = t_prev.seat_id
-            JOIN seats s
-              ON s.seat_id = t_prev.seat_id
-            WHERE t_prev.start_iso = ?
-              AND t_prev.status = 'UNAVAILABLE'
-              AND t_prevprev.start_iso = ?
-              AND t_prevprev.status = 'AVAILABLE'
-              {power_sql}
-              {area_sql}
-            ORDER BY s.seat_id;
-            """
-            params = [prev_start_iso, prevprev_start_iso] + power_params + area_params
-
-        rows = conn.execute(sql, params).fetchall()
-        return [int(r[0]) for r in rows]
-    finally:
-        conn.close()
+    with get_conn(db_path) as conn:
+        return int(conn.execute(sql, params).fetchone()[0])
 
 
 # -------------------------
@@ -180,7 +217,7 @@ def observe_seat(
     if end_time <= start_time:
         return None
 
-    s = session or requests.Session()
+    s = session or _make_libcal_session()
 
     # fetch slots for that seat
     slots = fetch_slots_with_retry(s, seat_id, start_date, end_date)
@@ -198,24 +235,9 @@ def observe_seat(
     last_start_iso = _fmt(last_start)
     last_end_iso = _fmt(last_end)
 
-    first_ok = False
-    last_ok = False
-
-    for it in slots:
-        st = it.get("start")
-        en = it.get("end")
-        if not st or not en:
-            continue
-
-        status = status_from_classname(it.get("className", ""))
-
-        if st == first_start_iso and en == first_end_iso:
-            first_ok = (status == "AVAILABLE")
-
-        if st == last_start_iso and en == last_end_iso:
-            last_ok = (status == "AVAILABLE")
-
-        if first_ok and last_ok:
-            return seat_id
-
+    # two dict lookups instead of comparing every slot against both keys
+    index = _slot_index(slots)
+    if (_slot_is_available(index, first_start_iso, first_end_iso)
+            and _slot_is_available(index, last_start_iso, last_end_iso)):
+        return seat_id
     return None
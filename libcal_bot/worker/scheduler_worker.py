@@ -12,6 +12,7 @@ from libcal_bot.app.libcal_actions import run_hunt_now
 from libcal_bot.book_seats.automatic_checkin import checkin_now
 from libcal_bot.worker.tasks import dispatch_due_checkins, active_hunting
 
+from libcal_bot.fetch_availability.db import init_db
 from libcal_bot.fetch_availability.fetch_all_seats import clean_up, fetch_availability
 
 TZ = ZoneInfo("Europe/Amsterdam")
@@ -45,6 +46,19 @@ def nightly_job(db_path: str | None = None):
     )
     logging.info("Nightly availability update done: processed=%s failed=%s", processed, failed)
 
+    # 3) Planner stats: the cleanup + 5-day upsert changed most of timeslots, and
+    #    PRAGMA optimize would not re-analyze it (it only looks at tables this
+    #    connection's own queries used), so ANALYZE it explicitly. Then fold the
+    #    night's WAL back into the DB so daytime reads start from a small -wal.
+    conn = init_db(db_path)
+    try:
+        conn.execute("ANALYZE timeslots")
+        conn.commit()
+        busy, wal_frames, checkpointed = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        logging.info("Nightly WAL checkpoint: busy=%s frames=%s checkpointed=%s", busy, wal_frames, checkpointed)
+    finally:
+        conn.close()
+
 
 def update_today_job(db_path: str | None = None):
     today = datetime.now(TZ).date()
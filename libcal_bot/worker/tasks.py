@@ -2,11 +2,14 @@ from __future__ import annotations
 
 import json
 import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from typing import Any, Callable
 from zoneinfo import ZoneInfo
 
-from libcal_bot.fetch_availability.db import init_db
+from libcal_bot.fetch_availability.db import get_conn
+from libcal_bot.paths import DB_PATH
 
 TZ = ZoneInfo("Europe/Amsterdam")
 
@@ -45,6 +48,41 @@ def _ensure_schema(conn: sqlite3.Connection) -> None:
     conn.commit()
 
 
+# db paths whose worker tables exist already (the schema is per file, not per connection)
+_SCHEMA_READY: set[str] = set()
+_SCHEMA_LOCK = threading.Lock()
+
+
+@contextmanager
+def _conn(db_path: str | None = None):
+    """
+    Pooled connection (get_conn) with the worker tables ensured once per db path,
+    instead of a fresh connection + schema script on every call / scheduler tick.
+    """
+    key = str(DB_PATH if db_path is None else db_path)
+    with get_conn(db_path) as conn:
+        if key not in _SCHEMA_READY:
+            with _SCHEMA_LOCK:
+                if key not in _SCHEMA_READY:
+                    _ensure_schema(conn)
+                    _SCHEMA_READY.add(key)
+        yield conn
+
+
+SQL_CLAIM_DUE = """
+UPDATE scheduled_checkins
+SET status='running', started_at_iso=?
+WHERE id IN (
+  SELECT id
+  FROM scheduled_checkins
+  WHERE status='pending' AND run_at_iso <= ?
+  ORDER BY run_at_iso ASC
+  LIMIT ?
+)
+RETURNING id, code, run_at_iso
+"""
+
+
 def _now_iso(tz: ZoneInfo = TZ) -> str:
     return datetime.now(tz).isoformat()
 
@@ -72,20 +110,17 @@ def schedule_checkin(
     planned_dt = datetime.fromisoformat(f"{checkin_date}T{checkin_start}").replace(tzinfo=tz)
     run_at = planned_dt + timedelta(minutes=5)
 
-    conn = init_db(db_path)
-    try:
-        _ensure_schema(conn)
-        cur = conn.execute(
-            """
-            INSERT INTO scheduled_checkins(run_at_iso, code, status, created_at_iso)
-            VALUES(?, ?, 'pending', ?)
-            """,
-            (run_at.isoformat(), code, _now_iso(tz)),
-        )
-        conn.commit()
+    with _conn(db_path) as conn:
+        # one transaction per user action (commit on success, rollback on error)
+        with conn:
+            cur = conn.execute(
+                """
+                INSERT INTO scheduled_checkins(run_at_iso, code, status, created_at_iso)
+                VALUES(?, ?, 'pending', ?)
+                """,
+                (run_at.isoformat(), code, _now_iso(tz)),
+            )
         return int(cur.lastrowid)
-    finally:
-        conn.close()
 
 
 def dispatch_due_checkins(
@@ -100,40 +135,21 @@ def dispatch_due_checkins(
     Runs due pending checkins and marks status done/failed.
     Returns number processed in this tick.
     """
-    conn = init_db(db_path)
-    try:
-        _ensure_schema(conn)
+    with _conn(db_path) as conn:
         now_iso = _now_iso(tz)
 
-        rows = conn.execute(
-            """
-            SELECT id, code
-            FROM scheduled_checkins
-            WHERE status='pending' AND run_at_iso <= ?
-            ORDER BY run_at_iso ASC
-            LIMIT ?
-            """,
-            (now_iso, max_per_tick),
-        ).fetchall()
+        # Claim the due ones in one statement (RETURNING needs SQLite >= 3.35):
+        # one commit per tick, and no window between reading and claiming a row
+        # (avoid double execution if multiple workers ever exist)
+        with conn:
+            rows = conn.execute(SQL_CLAIM_DUE, (now_iso, now_iso, max_per_tick)).fetchall()
+        rows.sort(key=lambda r: r[2])  # RETURNING order is unspecified
 
         processed = 0
 
-        for (cid, code) in rows:
+        for (cid, code, _run_at) in rows:
             cid = int(cid)
 
-            # Claim (avoid double execution if multiple workers ever exist)
-            cur = conn.execute(
-                """
-                UPDATE scheduled_checkins
-                SET status='running', started_at_iso=?
-                WHERE id=? AND status='pending'
-                """,
-                (_now_iso(tz), cid),
-            )
-            conn.commit()
-            if (cur.rowcount or 0) == 0:
-                continue
-
             try:
                 run_checkin_now(str(code))
 
@@ -161,8 +177,6 @@ def dispatch_due_checkins(
             processed += 1
 
         return processed
-    finally:
-        conn.close()
 
 
 # =========================
@@ -198,26 +212,22 @@ def start_hunting(
     if not p.get("start_dt_iso") or not p.get("end_dt_iso"):
         raise ValueError("Hunting payload must include start_dt/end_dt (datetime) or start_dt_iso/end_dt_iso (strings).")
 
-    conn = init_db(db_path)
-    try:
-        _ensure_schema(conn)
-        conn.execute(
-            """
-            UPDATE hunting_state
-            SET active=1,
-                payload_json=?,
-                created_at_iso=?,
-                last_run_at_iso=NULL,
-                stopped_at_iso=NULL,
-                booked_json=NULL,
-                error=NULL
-            WHERE id=1
-            """,
-            (json.dumps(p), _now_iso(tz)),
-        )
-        conn.commit()
-    finally:
-        conn.close()
+    with _conn(db_path) as conn:
+        with conn:
+            conn.execute(
+                """
+                UPDATE hunting_state
+                SET active=1,
+                    payload_json=?,
+                    created_at_iso=?,
+                    last_run_at_iso=NULL,
+                    stopped_at_iso=NULL,
+                    booked_json=NULL,
+                    error=NULL
+                WHERE id=1
+                """,
+                (json.dumps(p), _now_iso(tz)),
+            )
 
 
 def stop_hunting(
@@ -226,22 +236,18 @@ def stop_hunting(
     db_path: str | None = None,
     tz: ZoneInfo = TZ,
 ) -> None:
-    conn = init_db(db_path)
-    try:
-        _ensure_schema(conn)
-        conn.execute(
-            """
-            UPDATE hunting_state
-            SET active=0,
-                stopped_at_iso=?,
-                error=?
-            WHERE id=1
-            """,
-            (_now_iso(tz), reason),
-        )
-        conn.commit()
-    finally:
-        conn.close()
+    with _conn(db_path) as conn:
+        with conn:
+            conn.execute(
+                """
+                UPDATE hunting_state
+                SET active=0,
+                    stopped_at_iso=?,
+                    error=?
+                WHERE id=1
+                """,
+                (_now_iso(tz), reason),
+            )
 
 
 def active_hunting(
@@ -257,9 +263,7 @@ def active_hunting(
     If active -> calls run_hunt_now(...) with stored payload.
     If booking succeeds (result.get("booked")) -> hunting is automatically turned OFF.
     """
-    conn = init_db(db_path)
-    try:
-        _ensure_schema(conn)
+    with _conn(db_path) as conn:
         row = conn.execute(
             "SELECT active, payload_json FROM hunting_state WHERE id=1"
         ).fetchone()
@@ -294,7 +298,7 @@ def active_hunting(
                     error=?
                 WHERE id=1
                 """,
-                (_now_iso(tz), "Stopped automatically: within 2 hours of end_time"),
+                (now.isoformat(), "Stopped automatically: within 2 hours of end_time"),
             )
             conn.commit()
             return {
@@ -313,10 +317,12 @@ def active_hunting(
 
         try:
             result = run_hunt_now(**kwargs)
+            # one timestamp for both stamps of this run (taken after it finished)
+            done_iso = _now_iso(tz)
 
             conn.execute(
                 "UPDATE hunting_state SET last_run_at_iso=? WHERE id=1",
-                (_now_iso(tz),),
+                (done_iso,),
             )
 
             if result.get("booked"):
@@ -329,7 +335,7 @@ def active_hunting(
                         error=NULL
                     WHERE id=1
                     """,
-                    (_now_iso(tz), json.dumps(result.get("booked"))),
+                    (done_iso, json.dumps(result.get("booked"))),
                 )
 
             conn.commit()
@@ -342,8 +348,6 @@ def active_hunting(
             )
             conn.commit()
             raise
-    finally:
-        conn.close()
 
 
 def list_checkins(
@@ -352,9 +356,7 @@ def list_checkins(
     limit: int = 50,
     status: str | None = None,  # 'pending'|'running'|'done'|'failed'|'cancelled' or None
 ) -> list[dict[str, Any]]:
-    conn = init_db(db_path)
-    try:
-        _ensure_schema(conn)
+    with _conn(db_path) as conn:
         if status is None:
             rows = conn.execute(
                 """
@@ -391,8 +393,6 @@ def list_checkins(
                 )
             )
         return out
-    finally:
-        conn.close()
 
 
 def cancel_checkin(
@@ -404,27 +404,21 @@ def cancel_checkin(
     Cancel only if still pending (safe).
     Returns True if cancelled.
     """
-    conn = init_db(db_path)
-    try:
-        _ensure_schema(conn)
-        cur = conn.execute(
-            """
-            UPDATE scheduled_checkins
-            SET status='cancelled', finished_at_iso=?
-            WHERE id=? AND status='pending'
-            """,
-            (_now_iso(TZ), int(checkin_id)),
-        )
-        conn.commit()
+    with _conn(db_path) as conn:
+        with conn:
+            cur = conn.execute(
+                """
+                UPDATE scheduled_checkins
+                SET status='cancelled', finished_at_iso=?
+                WHERE id=? AND status='pending'
+                """,
+                (_now_iso(TZ), int(checkin_id)),
+            )
         return (cur.rowcount or 0) > 0
-    finally:
-        conn.close()
 
 
 def get_hunting_status(*, db_path: str | None = None) -> dict[str, Any]:
-    conn = init_db(db_path)
-    try:
-        _ensure_schema(conn)
+    with _conn(db_path) as conn:
         row = conn.execute(
             """
             SELECT active, payload_json, created_at_iso, last_run_at_iso, stopped_at_iso, booked_json, error
@@ -449,5 +443,3 @@ def get_hunting_status(*, db_path: str | None = None) -> dict[str, Any]:
             "booked": json.loads(booked_json) if booked_json else None,
             "error": row[6],
         }
-    finally:
-        conn.close()